@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+from indicators import IndicatorCache, price_matrices, per_bar
+from strategies import STRATEGIES, fired
+
+HORIZONS = (5, 10, 20)
+
+
+def _forward_return(close: np.ndarray, horizon: int) -> np.ndarray:
+    out = np.full(close.shape, np.nan)
+    out[:-horizon] = close[horizon:] / close[:-horizon] - 1
+    return out
+
+
+def _forward_drawdown(close: np.ndarray, low: np.ndarray, horizon: int) -> np.ndarray:
+    # Worst low over the next `horizon` bars relative to the signal close, capped at 0.
+    out = np.full(close.shape, np.nan)
+    if horizon < close.shape[0]:
+        windows = np.lib.stride_tricks.sliding_window_view(low[1:], horizon, axis=0)
+        out[:-horizon] = windows.min(axis=-1) / close[:-horizon] - 1
+    return np.minimum(out, 0.0)
+
+
+def forward_outcomes(close: np.ndarray, low: np.ndarray, horizons: tuple = HORIZONS):
+    """
+    Per cell of (dates × symbols) arrays: the forward return (%) after each horizon, keyed by
+    horizon, and the drawdown (%) over the longest one, each on the symbol's own bars.
+    """
+    low = np.where(np.isnan(low), close, low)
+    returns = {h: per_bar(_forward_return, close, horizon=h) * 100 for h in horizons}
+    drawdown = per_bar(_forward_drawdown, close, low, horizon=max(horizons)) * 100
+    return returns, drawdown
+
+
+def date_mask(dates: pd.DatetimeIndex, start=None, end=None) -> np.ndarray:
+    in_range = np.ones(len(dates), dtype=bool)
+    if start is not None:
+        in_range &= dates >= pd.Timestamp(start)
+    if end is not None:
+        in_range &= dates <= pd.Timestamp(end)
+    return in_range
+
+
+def run_backtest(data: dict, strategies: list = None, start=None, end=None,
+                 horizons: tuple = HORIZONS) -> pd.DataFrame:
+    """
+    Find every bar between `start` and `end` where any of `strategies` (all registered ones
+    with default parameters when omitted) fires, for every symbol in `data`, in one sweep.
+
+    Returns one row per signal with the close on the signal bar, the forward return (%) after
+    each horizon (in bars) and the drawdown (%) over the longest horizon.
+    """
+    strategies = strategies or [cls() for cls in STRATEGIES.values()]
+    dates, symbols, bars = price_matrices(data, columns=('Close', 'Low'))
+    columns = ['Strategy', 'Symbol', 'Date', 'Close'] + [f'Return {h}D (%)' for h in horizons] + ['Drawdown (%)']
+    if not symbols:
+        return pd.DataFrame(columns=columns)
+
+    close = bars['Close']
+    ind = IndicatorCache(close, dates=dates)
+    returns, drawdown = forward_outcomes(close, bars['Low'], horizons)
+    in_range = date_mask(dates, start, end)
+
+    frames = []
+    for strategy in strategies:
+        signals = (ind.expand(fired(strategy, ind)) == 1) & in_range[:, None]
+        rows, cols = np.nonzero(signals)
+        frame = pd.DataFrame({
+            'Strategy': strategy.name,
+            'Symbol': np.asarray(symbols, dtype=object)[cols],
+            'Date': dates[rows],
+            'Close': close[rows, cols],
+        })
+        for h in horizons:
+            frame[f'Return {h}D (%)'] = returns[h][rows, cols]
+        frame['Drawdown (%)'] = drawdown[rows, cols]
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)[columns]
+
+
+def summarize(signals: pd.DataFrame, groups: dict = None) -> pd.DataFrame:
+    """
+    Signal count, hit rate and average return per horizon, and average/worst drawdown,
+    per strategy and, when `groups` ({name: symbols}) is given, per group as well.
+    """
+    keys = ['Strategy']
+    if groups:
+        membership = pd.DataFrame([(name, s) for name, members in groups.items() for s in members],
+                                  columns=['Group', 'Symbol'])
+        signals = signals.merge(membership, on='Symbol')
+        keys = ['Group', 'Strategy']
+
+    return_columns = [c for c in signals.columns if c.startswith('Return ')]
+    grouped = signals.groupby(keys)
+    summary = grouped.size().rename('Signals').to_frame()
+    for column in return_columns:
+        horizon = column.split()[1]
+        summary[f'Hit Rate {horizon} (%)'] = grouped[column].apply(lambda r: (r.dropna() > 0).mean() * 100)
+        summary[f'Avg Return {horizon} (%)'] = grouped[column].mean()
+    summary['Avg Drawdown (%)'] = grouped['Drawdown (%)'].mean()
+    summary['Worst Drawdown (%)'] = grouped['Drawdown (%)'].min()
+    return summary.round(2).reset_index()
@@ -0,0 +1,134 @@
+import json
+import os
+from collections.abc import Mapping
+import numpy as np
+import pandas as pd
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class BarArray(Mapping):
+    """
+    Bars of a whole universe as one contiguous (dates × symbols) array per column over a shared
+    date index; NaN where a symbol has no bar on a date.
+
+    Behaves like the `{symbol: DataFrame}` dicts returned by `load_bars` (indexing builds a
+    symbol's frame on demand), while `price_matrices` and everything built on it (`evaluate`,
+    `run_backtest`) use the arrays directly without per-symbol frames. Arrays can be float32 to
+    halve memory, and can be saved to disk and memory-mapped so worker processes share one copy.
+    """
+
+    def __init__(self, dates, symbols: list, columns: dict):
+        self.dates = pd.DatetimeIndex(dates)
+        self.symbols = list(symbols)
+        self.columns = columns
+        self._index = {symbol: i for i, symbol in enumerate(self.symbols)}
+
+    @classmethod
+    def from_long(cls, symbol_col, date_col, values: dict, symbols: list = None, dtype=np.float64):
+        """
+        Build from flat per-bar columns: symbol and date of each bar plus one value array per column.
+        """
+        symbol_col = np.asarray(symbol_col, dtype=object)
+        present = dict.fromkeys(symbol_col)
+        symbols = list(present) if symbols is None else [s for s in symbols if s in present]
+        index, rows = np.unique(np.asarray(date_col, dtype='datetime64[ns]'), return_inverse=True)
+        cols = pd.Index(symbols).get_indexer(symbol_col)
+        keep = cols >= 0
+        columns = {}
+        for column, col_values in values.items():
+            arr = np.full((len(index), len(symbols)), np.nan, dtype=dtype)
+            arr[rows[keep], cols[keep]] = np.asarray(col_values, dtype=float)[keep]
+            columns[column] = arr
+        return cls(index, symbols, columns)
+
+    @classmethod
+    def from_frames(cls, data: dict, symbols: list = None, columns: list = BAR_COLUMNS, dtype=np.float64):
+        """
+        Build from `{symbol: DataFrame}` with a Date column, e.g. the output of `load_bars`.
+        """
+        symbols = [s for s in (symbols or data) if s in data and not data[s].empty]
+        frames = [data[s] for s in symbols]
+        if not frames:
+            return cls([], [], {c: np.empty((0, 0), dtype=dtype) for c in columns})
+        return cls.from_long(
+            np.repeat(np.asarray(symbols, dtype=object), [len(df) for df in frames]),
+            np.concatenate([df['Date'].to_numpy(dtype='datetime64[ns]') for df in frames]),
+            {c: np.concatenate([df[c].to_numpy(dtype=float) if c in df else np.full(len(df), np.nan)
+                                for df in frames]) for c in columns},
+            symbols, dtype,
+        )
+
+    def __getitem__(self, symbol: str) -> pd.DataFrame:
+        return self.frame(symbol)
+
+    def __iter__(self):
+        return iter(self.symbols)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol) -> bool:
+        return symbol in self._index
+
+    @property
+    def nbytes(self) -> int:
+        return sum(arr.nbytes for arr in self.columns.values()) + self.dates.nbytes
+
+    def view(self, symbol: str) -> dict:
+        """
+        One symbol's columns as views into the shared arrays (no copy), over the full date index.
+        """
+        i = self._index[symbol]
+        return {column: arr[:, i] for column, arr in self.columns.items()}
+
+    def frame(self, symbol: str) -> pd.DataFrame:
+        """
+        One symbol's bars as a DataFrame shaped like `load_bars` output (Date plus float64 columns).
+        """
+        view = self.view(symbol)
+        has_bar = ~np.isnan(view['Close'])
+        df = pd.DataFrame({column: values[has_bar].astype(float) for column, values in view.items()})
+        df.insert(0, 'Date', self.dates[has_bar])
+        return df
+
+    def select(self, symbols: list):
+        """
+        A new BarArray with only `symbols` (in that order) and only the dates any of them traded.
+        """
+        cols = [self._index[s] for s in symbols if s in self._index]
+        picked = {column: arr[:, cols] for column, arr in self.columns.items()}
+        has_bar = ~np.isnan(picked['Close']).all(axis=1)
+        return BarArray(self.dates[has_bar], [self.symbols[i] for i in cols],
+                        {column: arr[has_bar] for column, arr in picked.items()})
+
+    def matrices(self, columns: tuple = ('Close', 'High', 'Low'), symbols: list = None):
+        """
+        Same result as `price_matrices` on the equivalent dict of frames: (dates, symbols, float64 arrays).
+        """
+        bars = self if symbols is None or list(symbols) == self.symbols else self.select(symbols)
+        arrays = {c: np.asarray(bars.columns[c], dtype=float) for c in columns}
+        return bars.dates, list(bars.symbols), arrays
+
+    def save(self, path: str):
+        """
+        Write to directory `path` as one .npy file per column, for `load(path, mmap=True)`.
+        """
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "dates.npy"), self.dates.to_numpy(dtype='datetime64[ns]'))
+        for column, arr in self.columns.items():
+            np.save(os.path.join(path, f"{column}.npy"), np.ascontiguousarray(arr))
+        with open(os.path.join(path, "symbols.json"), 'w') as f:
+            json.dump({'symbols': self.symbols, 'columns': list(self.columns)}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True):
+        """
+        Open a saved BarArray; with `mmap` the column arrays are read-only memory maps shared
+        through the OS page cache by every process that opens them.
+        """
+        with open(os.path.join(path, "symbols.json")) as f:
+            meta = json.load(f)
+        mode = 'r' if mmap else None
+        columns = {c: np.load(os.path.join(path, f"{c}.npy"), mmap_mode=mode) for c in meta['columns']}
+        return cls(np.load(os.path.join(path, "dates.npy")), meta['symbols'], columns)
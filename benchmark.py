@@ -0,0 +1,250 @@
+"""
+Offline scan benchmark, e.g.
+
+    python benchmark.py --universe nifty50 --universe nifty500 --universe usa --repeat 3
+
+Runs every scan stage (universe load, fetch into the bar store, store read, indicators,
+detection, signal DB write, result rendering) on deterministic synthetic bars, reports time,
+throughput and peak memory per stage, and compares against saved baselines. Memory is traced
+in one extra run so that tracing does not slow down the timed runs.
+Exits with 1 when a stage is slower than its baseline by more than the tolerance.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+import numpy as np
+import pandas as pd
+import db
+from utils import RateLimiter, load_group_symbols
+from universe import Universe
+from store import BarStore, refresh_bars
+from indicators import IndicatorCache, price_matrices
+from strategies import STRATEGIES, fired
+
+UNIVERSES = {
+    'nifty50': ("India", "Nifty 50"),
+    'nifty500': ("India", "Nifty 500"),
+    'usa': ("USA", "ALL USA Stocks"),
+}
+BASELINE_FILE = "benchmarks/baseline.json"
+
+
+class SyntheticProvider:
+    """
+    Deterministic OHLCV provider with the same call signature as `yfinance_provider`.
+
+    Each symbol gets its own seeded random walk from `origin` to `end`, so its bars are identical
+    across runs, chunkings and overlapping `period`/`start` requests; every column is drawn from
+    its own generator, so moving `end` later only appends bars and never changes earlier ones.
+    """
+
+    def __init__(self, seed: int = 0, end: str = "2025-06-30", origin: str = "2000-01-03"):
+        self.seed = seed
+        self.dates = pd.bdate_range(origin, end)
+        self.calls = 0
+
+    def bars(self, symbol: str) -> pd.DataFrame:
+        seed = [self.seed, zlib.crc32(symbol.encode())]
+        rng, gap_rng, high_rng, low_rng, volume_rng = (np.random.default_rng(seed + [k]) for k in range(5))
+        n = len(self.dates)
+        vol = rng.uniform(0.01, 0.03)
+        close = rng.uniform(20, 2000) * np.exp(np.cumsum(rng.normal(0.0003, vol, n)))
+        gap = gap_rng.normal(0, vol / 3, n)
+        open_ = np.concatenate([[close[0]], close[:-1]]) * np.exp(gap)
+        high = np.maximum(open_, close) * np.exp(np.abs(high_rng.normal(0, vol / 2, n)))
+        low = np.minimum(open_, close) * np.exp(-np.abs(low_rng.normal(0, vol / 2, n)))
+        volume = np.round(volume_rng.lognormal(12, 1, n))
+        return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume},
+                            index=pd.Index(self.dates, name='Date'))
+
+    def __call__(self, symbols: list, interval: str = '1d', period: str = None, start=None) -> dict:
+        self.calls += 1
+        first = pd.Timestamp(start) if start else self.dates[-1] - _period_offset(period or "5y")
+        frames = {}
+        for symbol in symbols:
+            df = self.bars(symbol)
+            frames[symbol] = df[df.index >= first]
+        return frames
+
+
+def _period_offset(period: str) -> pd.DateOffset:
+    units = {'y': 'years', 'mo': 'months', 'wk': 'weeks', 'd': 'days'}
+    for unit, name in units.items():
+        if period.endswith(unit) and period[:-len(unit)].isdigit():
+            return pd.DateOffset(**{name: int(period[:-len(unit)])})
+    raise ValueError(f"Unsupported period '{period}'")
+
+
+def run_once(market: str, group: str, strategies: list, history: str, workdir: str,
+             trace_memory: bool = False) -> list:
+    """
+    Run every stage once in `workdir` and return [(stage, seconds, symbols, bars, peak MB)].
+
+    With `trace_memory`, the peak is the most memory allocated through Python (numpy and pandas
+    included) during the stage beyond what was allocated when it started; otherwise it is None.
+    """
+    timings = []
+
+    def stage(name, func):
+        if trace_memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        peak = (tracemalloc.get_traced_memory()[1] - before) / 2 ** 20 if trace_memory else None
+        timings.append((name, seconds, peak))
+        return result
+
+    def universe():
+        # Build the index from the constituent CSVs on every run: `get_universe()` is memoized
+        # per process, so later runs would only time a cached lookup.
+        if market == "India":
+            return [s + ".NS" for s in Universe.from_dir().resolve(group)]
+        return load_group_symbols(market, group)
+    symbols = stage('universe', universe)
+    store = BarStore(os.path.join(workdir, "bars.db"))
+    provider = SyntheticProvider()
+    unlimited = RateLimiter(max_calls=sys.maxsize)
+    stage('fetch', lambda: refresh_bars(symbols, '1d', history=history, store=store, provider=provider,
+                                        rate_limiter=unlimited))
+    data = stage('read', lambda: store.read_many(symbols, '1d'))
+
+    def indicators():
+        dates, columns, bars = price_matrices(data, symbols=symbols)
+        ind = IndicatorCache(bars['Close'], bars['High'], bars['Low'], dates)
+        for strategy in strategies:
+            for spec in strategy.indicators:
+                ind.compute(spec)
+        return columns, ind
+    columns, ind = stage('indicators', indicators)
+
+    def detection():
+        last = ind.position()
+        rows, cols = np.maximum(last, 0), np.arange(len(columns))
+        hits = {s.name: fired(s, ind)[rows, cols] & (last >= 0) for s in strategies}
+        prices = ind.close[-1]
+        return [(columns[i], prices[i], name) for name, hit in hits.items() for i in np.flatnonzero(hit)]
+    matches = stage('detection', detection)
+
+    def db_write():
+        db.create_db()
+        return db.insert_signals([(symbol, price, name, "Daily") for symbol, price, name in matches])
+    stage('db_write', db_write)
+
+    def render():
+        rows = [{"Symbol": symbol, "Price": round(price, 2), name: "✅",
+                 "Chart": f"https://www.tradingview.com/chart/?symbol=NSE:{symbol.replace('.NS', '')}"}
+                for symbol, price, name in matches]
+        return pd.DataFrame(rows).to_html()
+    stage('render', render)
+    n_bars = sum(len(df) for df in data.values())
+    return [(name, seconds, len(symbols), n_bars, peak) for name, seconds, peak in timings]
+
+
+def benchmark(universe: str, strategies: list, history: str = "5y", repeat: int = 3) -> pd.DataFrame:
+    """
+    Best-of-`repeat` timings per stage for one universe, plus the peak memory of each stage from
+    one more run with memory tracing, each run in a fresh temporary directory.
+    """
+    market, group = UNIVERSES[universe]
+    runs = []
+    db_file = db.DB_FILE
+    for run in range(repeat + 1):
+        trace_memory = run == repeat
+        with tempfile.TemporaryDirectory() as workdir:
+            db.DB_FILE = os.path.join(workdir, "signals.db")
+            if trace_memory:
+                tracemalloc.start()
+            try:
+                rows = run_once(market, group, strategies, history, workdir, trace_memory)
+            finally:
+                if trace_memory:
+                    tracemalloc.stop()
+                db.close_connection()
+                db.DB_FILE = db_file
+        if trace_memory:
+            peaks = {name: peak for name, _, _, _, peak in rows}
+        else:
+            runs += rows
+    df = pd.DataFrame(runs, columns=['Stage', 'Seconds', 'Symbols', 'Bars', 'Peak Memory (MB)'])
+    df = df.groupby('Stage', sort=False).agg({'Seconds': 'min', 'Symbols': 'first', 'Bars': 'first'}).reset_index()
+    df['Peak Memory (MB)'] = df['Stage'].map(peaks)
+    df['Symbols/s'] = df['Symbols'] / df['Seconds']
+    df['Bars/s'] = df['Bars'] / df['Seconds']
+    df.insert(0, 'Universe', universe)
+    return df
+
+
+def compare(results: pd.DataFrame, baseline: dict, tolerance: float, min_seconds: float = 0.01) -> pd.DataFrame:
+    """
+    Add each stage's baseline seconds and change (%), and flag slowdowns beyond `tolerance`.
+    Slowdowns under `min_seconds` are timer noise and never flagged.
+    """
+    results = results.copy()
+    results['Baseline'] = [baseline.get(u, {}).get(s) for u, s in zip(results['Universe'], results['Stage'])]
+    baseline_seconds = results['Baseline'].astype(float)
+    results['Change (%)'] = (results['Seconds'] / baseline_seconds - 1) * 100
+    results['Regression'] = ((results['Change (%)'] > tolerance * 100)
+                             & (results['Seconds'] - baseline_seconds > min_seconds))
+    return results
+
+
+def load_baseline(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(results: pd.DataFrame, path: str):
+    baseline = load_baseline(path)
+    for universe, group in results.groupby('Universe'):
+        baseline[universe] = dict(zip(group['Stage'], group['Seconds']))
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark every scan stage on synthetic offline data.")
+    parser.add_argument('--universe', action='append', choices=list(UNIVERSES),
+                        help="Universe to benchmark; repeat for several. Defaults to nifty50 and nifty500.")
+    parser.add_argument('--strategy', action='append', choices=list(STRATEGIES),
+                        help="Strategy key to scan for; repeat for several. Defaults to all.")
+    parser.add_argument('--history', default="5y", help="Bars of history per symbol, e.g. 1y or 5y.")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per universe; the fastest is kept.")
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true', help="Store these timings as the new baseline.")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown before failing (0.25 = 25%%).")
+    parser.add_argument('--json', help="Also write the results as JSON records to this file.")
+    args = parser.parse_args(argv)
+
+    strategies = [STRATEGIES[key]() for key in args.strategy or STRATEGIES]
+    results = pd.concat([benchmark(universe, strategies, args.history, args.repeat)
+                         for universe in args.universe or ['nifty50', 'nifty500']], ignore_index=True)
+    results = compare(results, load_baseline(args.baseline), args.tolerance)
+
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(results.round(3).to_string(index=False))
+    if args.json:
+        results.to_json(args.json, orient='records', indent=2)
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    regressions = results[results['Regression']]
+    for row in regressions.itertuples():
+        print(f"Regression: {row.Universe}/{row.Stage} took {row.Seconds:.3f}s vs {row.Baseline:.3f}s baseline")
+    return 1 if len(regressions) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,56 @@
 import sqlite3
 import os
+import threading
 from datetime import datetime, timedelta
-import yfinance as yf
+import numpy as np
+import pandas as pd
+from store import load_bars
+from metrics import METRICS
 
 DB_FILE = "signals.db"
 
+SIGNAL_COLUMNS = """
+    id, symbol, strategy, interval, signal_date, price_at_signal,
+    price_5d, price_10d, result_5d, result_10d, gain_5d, gain_10d
+"""
+
+_local = threading.local()
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Connection to DB_FILE for the calling thread, opened once in WAL mode and reused.
+    """
+    conns = getattr(_local, 'conns', None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(DB_FILE)
+    if conn is None:
+        conn = sqlite3.connect(DB_FILE, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conns[DB_FILE] = conn
+    return conn
+
+def close_connection():
+    """
+    Close the calling thread's connection to DB_FILE, if it has one.
+    """
+    conn = getattr(_local, 'conns', {}).pop(DB_FILE, None)
+    if conn is not None:
+        conn.close()
+
 def create_db():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("""
+    conn = get_connection()
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(signals)")]
+    if columns and 'strategy' not in columns:
+        # Tables from before signals recorded their strategy/interval: rebuild with the wider unique key.
+        conn.execute("ALTER TABLE signals RENAME TO signals_old")
+    conn.execute("""
         CREATE TABLE IF NOT EXISTS signals (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             symbol TEXT NOT NULL,
+            strategy TEXT NOT NULL DEFAULT '',
+            interval TEXT NOT NULL DEFAULT '',
             signal_date TEXT NOT NULL,
             price_at_signal REAL NOT NULL,
             price_5d REAL,
@@ -20,71 +59,152 @@ def create_db():
             result_10d TEXT,
             gain_5d REAL,
             gain_10d REAL,
-            UNIQUE(symbol, signal_date)
+            UNIQUE(symbol, signal_date, strategy, interval)
         )
     """)
+    if columns and 'strategy' not in columns:
+        conn.execute("""
+            INSERT INTO signals (id, symbol, signal_date, price_at_signal, price_5d, price_10d,
+                                 result_5d, result_10d, gain_5d, gain_10d)
+            SELECT id, symbol, signal_date, price_at_signal, price_5d, price_10d,
+                   result_5d, result_10d, gain_5d, gain_10d
+            FROM signals_old
+        """)
+        conn.execute("DROP TABLE signals_old")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_signals_date ON signals (signal_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_signals_symbol ON signals (symbol)")
     conn.commit()
-    conn.close()
 
-def insert_signal(symbol: str, price: float):
-    signal_date = datetime.now().strftime('%Y-%m-%d')
+def insert_signals(rows: list, signal_date: str = None) -> int:
+    """
+    Insert (symbol, price, strategy, interval) rows in one transaction; duplicates for the
+    same day are ignored. Returns the number of new rows.
+    """
+    signal_date = signal_date or datetime.now().strftime('%Y-%m-%d')
+    conn = get_connection()
     try:
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT OR IGNORE INTO signals (symbol, signal_date, price_at_signal)
-            VALUES (?, ?, ?)
-        """, (symbol, signal_date, price))
-        conn.commit()
+        before = conn.total_changes
+        with conn, METRICS.timer('db_write', len(rows)):
+            conn.executemany("""
+                INSERT OR IGNORE INTO signals (symbol, price_at_signal, strategy, interval, signal_date)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(symbol, float(price), strategy, interval, signal_date)
+                  for symbol, price, strategy, interval in rows])
+        METRICS.incr('signals_written', conn.total_changes - before)
+        return conn.total_changes - before
     except Exception as e:
+        METRICS.incr('db_errors')
         print(f"Insert error: {e}")
-    finally:
-        conn.close()
+        return 0
+
+def insert_signal(symbol: str, price: float, strategy: str = '', interval: str = ''):
+    insert_signals([(symbol, price, strategy, interval)])
+
+def _signal_filters(start=None, end=None, symbol: str = None, strategy: str = None):
+    clauses, params = [], []
+    if start:
+        clauses.append("signal_date >= ?")
+        params.append(str(start))
+    if end:
+        clauses.append("signal_date <= ?")
+        params.append(str(end))
+    if symbol:
+        clauses.append("symbol LIKE ?")
+        params.append(f"%{symbol.strip().upper()}%")
+    if strategy:
+        clauses.append("strategy = ?")
+        params.append(strategy)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+def fetch_signals(start=None, end=None, symbol: str = None, strategy: str = None,
+                  limit: int = None, offset: int = 0) -> list:
+    """
+    Signals filtered by date range, symbol substring and strategy, newest first, one page at a time.
+    """
+    where, params = _signal_filters(start, end, symbol, strategy)
+    sql = f"SELECT {SIGNAL_COLUMNS} FROM signals{where} ORDER BY signal_date DESC, id DESC"
+    if limit is not None:
+        sql += " LIMIT ? OFFSET ?"
+        params += [limit, offset]
+    return get_connection().execute(sql, params).fetchall()
+
+def signal_stats(start=None, end=None, symbol: str = None, strategy: str = None) -> dict:
+    """
+    Count and 5/10-day wins of the signals matching the same filters as `fetch_signals`.
+    """
+    where, params = _signal_filters(start, end, symbol, strategy)
+    count, wins_5d, wins_10d = get_connection().execute(f"""
+        SELECT COUNT(*), COALESCE(SUM(result_5d = '✅'), 0), COALESCE(SUM(result_10d = '✅'), 0)
+        FROM signals{where}
+    """, params).fetchone()
+    return {'count': count, 'wins_5d': wins_5d, 'wins_10d': wins_10d}
+
+def fetch_strategies() -> list:
+    return [row[0] for row in get_connection().execute("SELECT DISTINCT strategy FROM signals ORDER BY strategy")]
 
 def fetch_all_signals():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM signals ORDER BY signal_date DESC")
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-def update_signal_prices():
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, symbol, signal_date, price_at_signal FROM signals WHERE price_5d IS NULL OR price_10d IS NULL")
-    rows = cursor.fetchall()
-
-    for row in rows:
-        signal_id, symbol, signal_date, price_at_signal = row
-        try:
-            df = yf.Ticker(symbol).history(start=signal_date, interval='1d')
-            df = df[df.index > signal_date]  # only future prices
-
-            if len(df) >= 5:
-                price_5d = df.iloc[4]['Close']
-                gain_5d = ((price_5d - price_at_signal) / price_at_signal) * 100
-                result_5d = '✅' if gain_5d > 0 else '❌'
-            else:
-                price_5d = gain_5d = result_5d = None
-
-            if len(df) >= 10:
-                price_10d = df.iloc[9]['Close']
-                gain_10d = ((price_10d - price_at_signal) / price_at_signal) * 100
-                result_10d = '✅' if gain_10d > 0 else '❌'
-            else:
-                price_10d = gain_10d = result_10d = None
-
-            cursor.execute("""
-                UPDATE signals
-                SET price_5d=?, gain_5d=?, result_5d=?,
-                    price_10d=?, gain_10d=?, result_10d=?
-                WHERE id=?
-            """, (price_5d, gain_5d, result_5d,
-                  price_10d, gain_10d, result_10d, signal_id))
-
-            conn.commit()
-        except Exception as e:
-            print(f"Update failed for {symbol}: {e}")
-
-    conn.close()
+    return fetch_signals()
+
+def _outcome(price_at_signal: np.ndarray, closes: np.ndarray, first: np.ndarray, days: int):
+    """
+    Close `days` bars after each signal and the gain (%) from the signal price; NaN where not reached yet.
+    """
+    pos = first + days - 1
+    price = np.where(pos < len(closes), closes[np.minimum(pos, len(closes) - 1)], np.nan)
+    gain = (price - price_at_signal) / price_at_signal * 100
+    return price, gain
+
+def update_signal_prices() -> int:
+    """
+    Fill in the 5- and 10-day outcome of every pending signal.
+
+    Loads one daily history per distinct symbol (from the bar store), computes the outcomes of
+    all of that symbol's signals at once and writes every changed row in a single transaction.
+    Returns the number of signals that got an outcome they did not have before.
+    """
+    conn = get_connection()
+    pending = pd.read_sql_query(
+        "SELECT id, symbol, signal_date, price_at_signal, price_5d, price_10d FROM signals "
+        "WHERE price_5d IS NULL OR price_10d IS NULL",
+        conn
+    )
+    if pending.empty:
+        return 0
+    data = load_bars(pending['symbol'].unique().tolist(), interval='1d')
+
+    updates = []
+    for symbol, group in pending.groupby('symbol'):
+        df = data.get(symbol)
+        if df is None or df.empty:
+            print(f"Update failed for {symbol}: no price history")
+            continue
+        dates = df['Date'].to_numpy(dtype='datetime64[ns]')
+        closes = df['Close'].to_numpy(dtype=float)
+        signal_dates = pd.to_datetime(group['signal_date']).to_numpy(dtype='datetime64[ns]')
+        first = np.searchsorted(dates, signal_dates, side='right')  # only future prices
+        entry = group['price_at_signal'].to_numpy(dtype=float)
+        price_5d, gain_5d = _outcome(entry, closes, first, 5)
+        price_10d, gain_10d = _outcome(entry, closes, first, 10)
+
+        had_5d = group['price_5d'].notna().to_numpy()
+        had_10d = group['price_10d'].notna().to_numpy()
+        for i, signal_id in enumerate(group['id']):
+            if (had_5d[i] or np.isnan(price_5d[i])) and (had_10d[i] or np.isnan(price_10d[i])):
+                continue  # nothing new: outcomes not reached yet or already stored
+            row = []
+            for price, gain in ((price_5d[i], gain_5d[i]), (price_10d[i], gain_10d[i])):
+                if np.isnan(price):
+                    row += [None, None, None]
+                else:
+                    row += [float(price), float(gain), '✅' if gain > 0 else '❌']
+            updates.append((*row, int(signal_id)))
+
+    with conn, METRICS.timer('db_update', len(updates)):
+        conn.executemany("""
+            UPDATE signals
+            SET price_5d=?, gain_5d=?, result_5d=?,
+                price_10d=?, gain_10d=?, result_10d=?
+            WHERE id=?
+        """, updates)
+    METRICS.incr('signals_updated', len(updates))
+    return len(updates)
@@ -0,0 +1,313 @@
+import numpy as np
+import pandas as pd
+from timeframes import resample_matrix
+
+# Vectorized indicator engine over (dates × symbols) float arrays.
+# A NaN cell means "no bar for this symbol on this date"; every indicator skips such
+# cells, so each column matches the per-symbol functions in utils run on that symbol's bars.
+
+
+def price_matrices(data: dict, columns: tuple = ('Close', 'High', 'Low'), symbols: list = None):
+    """
+    Align OHLCV columns of many per-symbol frames into (dates × symbols) float arrays.
+
+    Returns the union date index, the symbol order of the array columns and a dict of arrays keyed by column.
+    A `BarArray` is used as is, without going through per-symbol frames.
+    """
+    if hasattr(data, 'matrices'):
+        return data.matrices(columns, symbols)
+    symbols = [s for s in (symbols or data) if s in data]
+    frames = [data[s] for s in symbols]
+    if not frames:
+        return pd.DatetimeIndex([]), symbols, {c: np.empty((0, 0)) for c in columns}
+    dates = np.concatenate([df['Date'].to_numpy(dtype='datetime64[ns]') for df in frames])
+    index, rows = np.unique(dates, return_inverse=True)
+    cols = np.repeat(np.arange(len(frames)), [len(df) for df in frames])
+    arrays = {}
+    for column in columns:
+        arr = np.full((len(index), len(frames)), np.nan)
+        arr[rows, cols] = np.concatenate([df[column].to_numpy(dtype=float) for df in frames])
+        arrays[column] = arr
+    return pd.DatetimeIndex(index), symbols, arrays
+
+
+def _compress(values: np.ndarray):
+    """
+    Move each column's bars to the bottom of the array so missing cells only lead.
+    Returns the packed array and the permutation needed by `_expand` (None if already packed).
+    """
+    valid = ~np.isnan(values)
+    if np.all(valid[1:] >= valid[:-1]):
+        return values, None
+    order = np.argsort(valid, axis=0, kind='stable')
+    return np.take_along_axis(values, order, axis=0), order
+
+
+def _expand(packed: np.ndarray, order, valid: np.ndarray) -> np.ndarray:
+    if order is None:
+        out = packed.copy()
+    else:
+        out = np.empty_like(packed)
+        np.put_along_axis(out, order, packed, axis=0)
+    out[~valid] = np.nan
+    return out
+
+
+def _ema(values: np.ndarray, span: int = None, alpha: float = None) -> np.ndarray:
+    # Same recursion as pandas `ewm(span=..., adjust=False).mean()`, one row of all symbols at a time.
+    alpha = alpha or 2.0 / (span + 1.0)
+    old_wt = 1.0 - alpha
+    out = np.empty_like(values)
+    prev = np.full(values.shape[1], np.nan)
+    for t in range(values.shape[0]):
+        cur = values[t]
+        prev = np.where(np.isnan(prev) | (prev == cur), cur, (old_wt * prev + alpha * cur) / (old_wt + alpha))
+        out[t] = prev
+    return out
+
+
+def _rolling_sums(values: np.ndarray, window: int):
+    """
+    Rolling sum and sum of squares of `values - base` for full windows only, plus the per-column base.
+    Shifting by the first bar keeps the running sums small and the variance well conditioned.
+    """
+    valid = ~np.isnan(values)
+    first = np.argmax(valid, axis=0)
+    base = np.nan_to_num(values[first, np.arange(values.shape[1])])
+    shifted = np.where(valid, values - base, 0.0)
+    zero = np.zeros((1, values.shape[1]))
+    cs = np.concatenate([zero, np.cumsum(shifted, axis=0)])
+    cs2 = np.concatenate([zero, np.cumsum(shifted * shifted, axis=0)])
+    cnt = np.concatenate([zero, np.cumsum(valid, axis=0)])
+
+    sums = np.full(values.shape, np.nan)
+    sq_sums = np.full(values.shape, np.nan)
+    if window <= values.shape[0]:
+        full = (cnt[window:] - cnt[:-window]) == window
+        sums[window - 1:] = np.where(full, cs[window:] - cs[:-window], np.nan)
+        sq_sums[window - 1:] = np.where(full, cs2[window:] - cs2[:-window], np.nan)
+    return sums, sq_sums, base
+
+
+def _std(sums: np.ndarray, sq_sums: np.ndarray, window: int) -> np.ndarray:
+    var = (sq_sums - sums * sums / window) / (window - 1)
+    return np.sqrt(np.maximum(var, 0.0))
+
+
+def _true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    prev_close = np.vstack([np.full((1, close.shape[1]), np.nan), close[:-1]])
+    return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+
+def per_bar(func, values: np.ndarray, *others: np.ndarray, **kwargs) -> np.ndarray:
+    """
+    Run `func` on each symbol's own bars: all arrays are packed by the bars present in
+    `values`, so `func` only ever sees leading NaNs, and the result is put back on the date grid.
+    """
+    values = np.asarray(values, dtype=float)
+    packed, order = _compress(values)
+    if order is not None:
+        others = [np.take_along_axis(np.asarray(o, dtype=float), order, axis=0) for o in others]
+    return _expand(func(packed, *others, **kwargs), order, ~np.isnan(values))
+
+
+def cross_above(a: np.ndarray, b) -> np.ndarray:
+    """
+    Per cell of packed arrays: `a` was below `b` on the previous row and is above it on this one.
+    `b` may be an array of the same shape or a scalar level.
+    """
+    b = np.broadcast_to(b, a.shape)
+    out = np.zeros(a.shape, dtype=bool)
+    with np.errstate(invalid='ignore'):
+        out[1:] = (a[:-1] < b[:-1]) & (a[1:] > b[1:])
+    return out
+
+
+class IndicatorCache:
+    """
+    Indicators over a universe of bars, computed on first use and shared by every strategy.
+
+    Bars are packed once (each column's bars at the bottom, see `_compress`) and all arrays
+    handed out are in that packed layout: row -1 is every symbol's latest bar and row t-1 is
+    always the bar before row t. `expand` maps a packed array back onto the date grid.
+    With the grid's `dates`, indicators can also be computed on weekly or monthly bars (see `on`).
+    """
+
+    def __init__(self, close: np.ndarray, high: np.ndarray = None, low: np.ndarray = None, dates=None):
+        close = np.asarray(close, dtype=float)
+        self.dates = None if dates is None else pd.DatetimeIndex(dates)
+        self.valid = ~np.isnan(close)
+        self.close, self.order = _compress(close)
+        self.high = self._pack(high)
+        self.low = self._pack(low)
+        self.n_bars = self.valid.sum(axis=0)
+        self._memo = {}
+
+    def _pack(self, values):
+        if values is None:
+            return None
+        values = np.asarray(values, dtype=float)
+        return values if self.order is None else np.take_along_axis(values, self.order, axis=0)
+
+    def _get(self, key, compute):
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    def release(self, spec: tuple):
+        """
+        Forget a memoized indicator to free its arrays; the building blocks it was derived
+        from (EMAs, rolling sums, ATR) stay cached.
+        """
+        self._memo.pop(tuple(spec), None)
+
+    def expand(self, values: np.ndarray) -> np.ndarray:
+        return _expand(np.asarray(values, dtype=float), self.order, self.valid)
+
+    def compute(self, spec: tuple):
+        """
+        Compute an indicator from a spec such as `('ema', 200)` or `('macd', 12, 26, 9)`.
+        """
+        return getattr(self, spec[0])(*spec[1:])
+
+    def warmed_up(self, lookback: int) -> np.ndarray:
+        """
+        Packed mask of bars preceded by at least `lookback - 1` bars of the same symbol.
+        """
+        rows = np.arange(self.close.shape[0])[:, None]
+        return rows >= self.close.shape[0] - self.n_bars + lookback - 1
+
+    def position(self, bar: int = None) -> np.ndarray:
+        """
+        Packed row of each symbol's bar on or before date-grid row `bar` (its last bar when None); -1 if none.
+        """
+        rows = self.close.shape[0]
+        seen = self.n_bars if bar is None else self.valid[:bar + 1].sum(axis=0)
+        return np.where(seen > 0, rows - self.n_bars + seen - 1, -1)
+
+    def timeframe(self, interval: str):
+        """
+        An `IndicatorCache` over these bars aggregated to `interval` ('1wk' or '1mo'), and for each
+        date-grid row the row of the latest higher-timeframe bar complete by then (see `resample_matrix`).
+        """
+        def compute():
+            if self.dates is None:
+                raise ValueError("Higher-timeframe indicators need the bar dates")
+            arrays = {'Close': self.expand(self.close)}
+            if self.high is not None:
+                arrays['High'] = self.expand(self.high)
+            if self.low is not None:
+                arrays['Low'] = self.expand(self.low)
+            dates, bars, complete = resample_matrix(self.dates, arrays, interval)
+            return IndicatorCache(bars['Close'], bars.get('High'), bars.get('Low'), dates), complete
+        return self._get(('timeframe', interval), compute)
+
+    def on(self, interval: str, spec: tuple):
+        """
+        Indicator `spec` computed on `interval` bars and aligned to these packed bars: each bar sees
+        the value of the last `interval` bar complete on its date, never one still forming.
+        Multi-array indicators such as MACD are aligned array by array.
+        """
+        def compute():
+            higher, complete = self.timeframe(interval)
+
+            def align(values):
+                grid = pd.DataFrame(higher.expand(values)).ffill().to_numpy()
+                return self._pack(np.where((complete >= 0)[:, None], grid[np.maximum(complete, 0)], np.nan))
+            values = higher.compute(spec)
+            return tuple(align(v) for v in values) if isinstance(values, tuple) else align(values)
+        return self._get(('on', interval, tuple(spec)), compute)
+
+    def ema(self, span: int) -> np.ndarray:
+        return self._get(('ema', span), lambda: _ema(self.close, span))
+
+    def _sums(self, window: int):
+        return self._get(('sums', window), lambda: _rolling_sums(self.close, window))
+
+    def sma(self, window: int) -> np.ndarray:
+        def compute():
+            sums, _, base = self._sums(window)
+            return sums / window + base
+        return self._get(('sma', window), compute)
+
+    def std(self, window: int) -> np.ndarray:
+        def compute():
+            sums, sq_sums, _ = self._sums(window)
+            return _std(sums, sq_sums, window)
+        return self._get(('std', window), compute)
+
+    def bands(self, window: int, width: float):
+        """
+        Moving average with upper and lower bands `width` standard deviations away.
+        """
+        mid, std = self.sma(window), self.std(window)
+        return mid, mid + width * std, mid - width * std
+
+    def macd(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        """
+        MACD line, signal line and histogram.
+        """
+        def compute():
+            line = self.ema(fast) - self.ema(slow)
+            signal_line = _ema(line, signal)
+            return line, signal_line, line - signal_line
+        return self._get(('macd', fast, slow, signal), compute)
+
+    def rsi(self, period: int = 14) -> np.ndarray:
+        """
+        Wilder's RSI: gains and losses smoothed with `ewm(alpha=1/period, adjust=False)`.
+        """
+        def compute():
+            delta = np.full(self.close.shape, np.nan)
+            delta[1:] = self.close[1:] - self.close[:-1]
+            gain = _ema(np.clip(delta, 0, None), alpha=1.0 / period)
+            loss = _ema(np.clip(-delta, 0, None), alpha=1.0 / period)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(loss == 0, 100.0, 100 - 100 / (1 + gain / loss))
+        return self._get(('rsi', period), compute)
+
+    def true_range(self) -> np.ndarray:
+        def compute():
+            high = self.close if self.high is None else self.high
+            low = self.close if self.low is None else self.low
+            return _true_range(high, low, self.close)
+        return self._get(('tr',), compute)
+
+    def atr(self, period: int = 14) -> np.ndarray:
+        """
+        Wilder's ATR: true range smoothed with `ewm(alpha=1/period, adjust=False)`.
+        """
+        return self._get(('atr', period), lambda: _ema(self.true_range(), alpha=1.0 / period))
+
+    def atr_stop(self, period: int = 14, factor: float = 1.8) -> np.ndarray:
+        """
+        Stop level `factor` ATRs below the close.
+        """
+        return self._get(('atr_stop', period, factor), lambda: self.close - factor * self.atr(period))
+
+
+def compute_indicators(close: np.ndarray, high: np.ndarray = None, low: np.ndarray = None,
+                       macd_spans: tuple = (12, 26, 9), ema_spans: tuple = (100, 200),
+                       sigma_period: int = 50, sigma_width: float = 2,
+                       atr_period: int = 14, atr_factor: float = 1.8) -> dict:
+    """
+    Compute EMA, MACD/Signal/Hist, rolling mean/std bands and ATR for every column in one pass.
+
+    Keys follow the column names used by `calculate_macd`, `calculate_sigma_signal` and the
+    EMA200 scan; ATR/ATR_Stop are only present when `high` and `low` are given.
+    """
+    ind = IndicatorCache(close, high, low)
+    fast, slow, signal = macd_spans
+    out = {'Close': ind.close}
+    for span in sorted(set(ema_spans) | {fast, slow}):
+        out[f'EMA{span}'] = ind.ema(span)
+    out['MACD'], out['Signal'], out['Hist'] = ind.macd(fast, slow, signal)
+
+    out[f'MA{sigma_period}'], out['Upper'], out['Lower'] = ind.bands(sigma_period, sigma_width)
+    out['STD'] = ind.std(sigma_period)
+
+    if high is not None and low is not None:
+        out['ATR'] = ind.atr(atr_period)
+        out['ATR_Stop'] = ind.atr_stop(atr_period, atr_factor)
+
+    return {name: ind.expand(values) for name, values in out.items()}
@@ -1,12 +1,14 @@
 import streamlit as st
 import pandas as pd
-import time
-from datetime import datetime
-from utils import (
-    fetch_weekly_data, fetch_daily_data, calculate_macd, calculate_sigma_signal,
-    detect_macd_cross, load_group_symbols
-)
-from db import create_db, insert_signal, fetch_all_signals, update_signal_prices
+from datetime import datetime, timedelta
+from utils import MARKET_GROUPS, load_group_symbols
+from universe import get_universe
+from metrics import Metrics
+from store import load_bar_array
+from pipeline import scan_cached
+from strategies import STRATEGIES, output_columns
+from backtest import run_backtest, summarize
+from db import create_db, insert_signals, fetch_signals, signal_stats, fetch_strategies, update_signal_prices
 from st_aggrid import AgGrid, GridOptionsBuilder
 import altair as alt
 
@@ -33,95 +35,94 @@ st.title("📈 Technical Signal Scanner")
 # Sidebar Configuration
 st.sidebar.header("🔧 Scanner Options")
 market = st.sidebar.selectbox("Select Market", ["India", "USA"])
+group_options = MARKET_GROUPS[market]
 if market == "India":
-    group_options = [
-        "Nifty 50", "Nifty Next 50", "Nifty 100", "Nifty 200", "Nifty 500",
-        "NIFTY Small cap 50", "NIFTY Small cap 100", "NIFTY Small cap 250",
-        "NIFTY MIDCAP 50", "NIFTY MIDCAP 100", "NIFTY MIDCAP 150", "BANK", "FINANCIAL SERVICES", "FMCG", "IT", "MEDIA",
-        "METAL", "PHARMA", "PSU BANK", "REALTY"
-    ]
-else:
-    group_options = ["ALL USA Stocks"]
+    group_options = group_options + [f"Industry: {name}" for name in sorted(get_universe().industries)]
 
 group_option = st.sidebar.selectbox("Select Group", group_options)
-scan_type = st.sidebar.selectbox("Scan Strategy", [
-    "MACD Bullish Crossover",
-    "Price Crosses Above 200 EMA",
-    "Sigma Signal"
-])
-interval = st.sidebar.radio("Data Interval", ["Weekly", "Daily"])
+scan_keys = st.sidebar.multiselect("Scan Strategies", list(STRATEGIES), default=["macd"],
+                                   format_func=lambda key: STRATEGIES[key].name)
+scan_strategies = [STRATEGIES[key]() for key in scan_keys]
+interval = st.sidebar.radio("Data Interval", ["Weekly", "Daily", "Monthly"])
+bar_interval = {"Daily": '1d', "Weekly": '1wk', "Monthly": '1mo'}[interval]
 backtest_date = st.sidebar.date_input("Backtest As Of Date (optional)", value=None)
+concurrency = st.sidebar.slider("Scan Concurrency", min_value=1, max_value=16, value=4)
 
 # Initialize DB
 create_db()
 tickers = load_group_symbols(market, group_option)
 print(tickers)
+
+# Each session records its own metrics, so concurrent users' scans do not mix.
+if 'metrics' not in st.session_state:
+    st.session_state.metrics = Metrics()
+session_metrics = st.session_state.metrics
+
 # Tab Layout
-tab1, tab2, tab3 = st.tabs(["🧪 Run Scanner", "📜 Signal Logs", "📈 Update Prices"])
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["🧪 Run Scanner", "📜 Signal Logs", "📈 Update Prices", "🧮 Backtest",
+                                        "⏱️ Metrics"])
 
 with tab1:
-    scan_triggered = st.button("🚀 Run Scan")
-    if scan_triggered:
+    col1, col2 = st.columns([1, 8])
+    with col1:
+        scan_triggered = st.button("🚀 Run Scan")
+    with col2:
+        # Any click reruns the script, which closes the running scan below and cancels what is left.
+        st.button("⏹️ Stop")
+    if scan_triggered and not scan_strategies:
+        st.warning("Select at least one scan strategy.")
+    elif scan_triggered:
+        session_metrics.reset()
         results = []
-        progress = st.progress(0)
-
-        for i, symbol in enumerate(tickers):
-            progress.progress((i + 1) / len(tickers))
-            df = fetch_weekly_data(symbol) if interval == "Weekly" else fetch_daily_data(symbol)
-            if df.empty or 'Close' not in df.columns:
-                continue
-
-            df['Date'] = pd.to_datetime(df['Date']).dt.tz_localize(None)
-
-            if scan_type == "MACD Bullish Crossover":
-                df = calculate_macd(df)
-                signal_found = detect_macd_cross(
-                    df[df['Date'] <= pd.to_datetime(backtest_date)]) if backtest_date else detect_macd_cross(df)
-
-            elif scan_type == "Sigma Signal":
-                df = calculate_sigma_signal(df)
-                signal_found = df.iloc[-1]['Sigma_Entry']
-
-            elif scan_type == "Price Crosses Above 200 EMA":
-                df['EMA200'] = df['Close'].ewm(span=200, adjust=False).mean()
-                if len(df) < 2:
-                    continue
-                prev_close = df.iloc[-2]['Close']
-                prev_ema = df.iloc[-2]['EMA200']
-                curr_close = df.iloc[-1]['Close']
-                curr_ema = df.iloc[-1]['EMA200']
-                signal_found = prev_close < prev_ema and curr_close > curr_ema
-            else:
-                signal_found = False
-
-            if signal_found:
-                price = df.iloc[-1]['Close']
-                chart_url = f"https://www.tradingview.com/chart/?symbol=NSE:{symbol.replace('.NS', '')}"
-                if backtest_date:
-                    df_bt = df[df['Date'] <= pd.to_datetime(backtest_date)]
-                    if df_bt.empty:
-                        continue
-                    price_then = df_bt.iloc[-1]['Close']
-                    gain_pct = ((price - price_then) / price_then) * 100
-                    result = "✅" if gain_pct > 0 else "❌"
-                    results.append({
-                        "Symbol": symbol,
-                        "Price on Backtest Date": round(price_then, 2),
-                        "Current Price": round(price, 2),
-                        "Gain %": round(gain_pct, 2),
-                        "Result": result,
-                        "Chart": chart_url
-                    })
-                else:
-                    insert_signal(symbol, price)
-                    results.append({
-                        "Symbol": symbol,
-                        "Price": round(price, 2),
-                        "Chart": chart_url
-                    })
-            time.sleep(0.5)
+        new_signals = []
+        progress = st.progress(0.0, text="Starting scan...")
+        live_table = st.empty()
+        done = 0
+        with session_metrics.activate():
+            stream = scan_cached(tickers, scan_strategies, interval=bar_interval,
+                                 as_of=backtest_date, group=f"{market}:{group_option}", max_workers=concurrency)
+            try:
+                for count, matches in stream:
+                    done += count
+                    progress.progress(done / len(tickers), text=f"Scanned {done}/{len(tickers)} symbols")
+                    for match in matches:
+                        symbol = match['Symbol']
+                        price = match['Price']
+                        chart_url = f"https://www.tradingview.com/chart/?symbol=NSE:{symbol.replace('.NS', '')}"
+                        if backtest_date:
+                            price_then = match['Price Then']
+                            gain_pct = ((price - price_then) / price_then) * 100
+                            result = "✅" if gain_pct > 0 else "❌"
+                            row = {
+                                "Symbol": symbol,
+                                "Price on Backtest Date": round(price_then, 2),
+                                "Current Price": round(price, 2),
+                                "Gain %": round(gain_pct, 2),
+                                "Result": result
+                            }
+                        else:
+                            new_signals += [(symbol, price, s.name, interval) for s in scan_strategies if match[s.name]]
+                            row = {
+                                "Symbol": symbol,
+                                "Price": round(price, 2)
+                            }
+                        row.update({s.name: "✅" if match[s.name] else "" for s in scan_strategies})
+                        row.update({name: round(match[name], 2) for name in output_columns(scan_strategies)})
+                        row["Chart"] = chart_url
+                        results.append(row)
+                    if matches:
+                        live_table.dataframe(pd.DataFrame(results), use_container_width=True)
+            finally:
+                stream.close()
+                if new_signals:
+                    insert_signals(new_signals)
 
         progress.empty()
+        live_table.empty()
+        if session_metrics.snapshot()['counters'].get('scan_cache_hits'):
+            st.caption("⚡ Served from the scan cache: no new bars since the last identical scan.")
+        order = {symbol: i for i, symbol in enumerate(tickers)}
+        results.sort(key=lambda row: order[row["Symbol"]])
 
         if results:
             st.subheader("📊 Scan Results")
@@ -151,10 +152,29 @@ with tab1:
             st.warning("No stocks matched the criteria.")
 
 with tab2:
-    rows = fetch_all_signals()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        log_range = st.date_input("Signal Dates", value=(), key="log_range")
+    with col2:
+        log_symbol = st.text_input("Symbol Contains", key="log_symbol")
+    with col3:
+        log_strategy = st.selectbox("Strategy", ["All"] + fetch_strategies(), key="log_strategy")
+    filters = {
+        "start": log_range[0] if len(log_range) > 0 else None,
+        "end": log_range[1] if len(log_range) > 1 else None,
+        "symbol": log_symbol or None,
+        "strategy": None if log_strategy == "All" else log_strategy,
+    }
+    stats = signal_stats(**filters)
+    page_size = 200
+    pages = max((stats['count'] - 1) // page_size + 1, 1)
+    with col4:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key="log_page")
+
+    rows = fetch_signals(**filters, limit=page_size, offset=(page - 1) * page_size)
     if rows:
         df = pd.DataFrame(rows, columns=[
-            "ID", "Symbol", "Signal Date", "Price at Signal",
+            "ID", "Symbol", "Strategy", "Interval", "Signal Date", "Price at Signal",
             "Price+5D", "Price+10D", "Result 5D", "Result 10D",
             "Gain 5D (%)", "Gain 10D (%)"
         ])
@@ -162,16 +182,77 @@ with tab2:
 
         col1, col2 = st.columns(2)
         with col1:
-            st.metric("📈 5-Day Win Rate", f"{df['Result 5D'].value_counts().get('✅', 0) / len(df) * 100:.2f}%")
+            st.metric("📈 5-Day Win Rate", f"{stats['wins_5d'] / stats['count'] * 100:.2f}%")
         with col2:
-            st.metric("📈 10-Day Win Rate", f"{df['Result 10D'].value_counts().get('✅', 0) / len(df) * 100:.2f}%")
+            st.metric("📈 10-Day Win Rate", f"{stats['wins_10d'] / stats['count'] * 100:.2f}%")
     else:
         st.info("No signals logged yet.")
 
 with tab3:
     if st.button("📥 Update Prices for Signals"):
-        update_signal_prices()
-        st.success("✅ Prices updated for all past signals.")
+        with st.spinner("Updating signal outcomes..."):
+            updated = update_signal_prices()
+        st.success(f"✅ Prices updated for {updated} pending signals.")
+
+with tab4:
+    bt_keys = st.multiselect("Strategies", list(STRATEGIES), default=list(STRATEGIES),
+                             format_func=lambda key: STRATEGIES[key].name)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        bt_start = st.date_input("From", value=datetime.now().date() - timedelta(days=3 * 365))
+    with col2:
+        bt_end = st.date_input("To", value=datetime.now().date())
+    with col3:
+        bt_horizons = st.multiselect("Forward Horizons (bars)", [5, 10, 20, 40, 60], default=[5, 10, 20])
+    bt_strategies = []
+    with st.expander("Strategy Parameters"):
+        for key in bt_keys:
+            strategy_cls = STRATEGIES[key]
+            params = {}
+            for col, (param, default) in zip(st.columns(len(strategy_cls.defaults)), strategy_cls.defaults.items()):
+                with col:
+                    params[param] = st.number_input(f"{strategy_cls.name}: {param}", value=default,
+                                                    key=f"bt_{key}_{param}")
+            bt_strategies.append(strategy_cls(**params))
+
+    if st.button("▶️ Run Backtest") and bt_strategies and bt_horizons:
+        with st.spinner(f"Backtesting {len(tickers)} symbols..."), session_metrics.activate():
+            data = load_bar_array(tickers, interval=bar_interval)
+            signals = run_backtest(
+                data, bt_strategies, start=bt_start, end=bt_end, horizons=tuple(sorted(bt_horizons))
+            )
+        if signals.empty:
+            st.warning("No signals in the selected range.")
+        else:
+            st.subheader("🏆 Strategy Summary")
+            st.dataframe(summarize(signals, groups={group_option: tickers}), use_container_width=True)
+            st.subheader("📋 All Signals")
+            AgGrid(signals.round(2), theme='alpine')
+
+with tab5:
+    st.caption("Timings and counters recorded in this session since its last scan started.")
+    metrics = session_metrics.snapshot()
+    if metrics['stages']:
+        st.dataframe(session_metrics.summary().round(4), use_container_width=True)
+        counters = sorted(metrics['counters'].items())
+        for cols in [counters[i:i + 4] for i in range(0, len(counters), 4)]:
+            for col, (name, value) in zip(st.columns(4), cols):
+                col.metric(name.replace('_', ' ').title(), value)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if st.button("💾 Append to metrics.jsonl"):
+                session_metrics.write_json_lines("metrics.jsonl")
+                st.success("Metrics appended to metrics.jsonl")
+        with col2:
+            if st.button("📤 Write metrics.prom"):
+                session_metrics.write_prometheus("metrics.prom")
+                st.success("Metrics written to metrics.prom")
+        with col3:
+            if st.button("🔄 Reset Metrics"):
+                session_metrics.reset()
+                st.rerun()
+    else:
+        st.info("No metrics recorded yet. Run a scan first.")
 
 # Footer
 st.markdown("""
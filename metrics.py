@@ -0,0 +1,142 @@
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+import pandas as pd
+
+# Scan instrumentation: per-stage latency (also per symbol, for stages that work on chunks of
+# symbols) and event counters such as cache hits, provider errors and rows written.
+# Code records into `METRICS`, which stands for the `Metrics` activated in the current context
+# (e.g. one UI session's scan), or a process-wide default when none is.
+
+_active = contextvars.ContextVar('metrics')
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    @contextmanager
+    def activate(self):
+        """
+        Make `METRICS` record into these metrics within the block, including in scan threads
+        started from it.
+        """
+        token = _active.set(self)
+        try:
+            yield self
+        finally:
+            _active.reset(token)
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+            self.started_at = time.time()
+
+    @contextmanager
+    def timer(self, stage: str, symbols: int = 0):
+        """
+        Time the enclosed block as one call of `stage` covering `symbols` symbols.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, symbols)
+
+    def record(self, stage: str, seconds: float, symbols: int = 0):
+        with self._lock:
+            entry = self.stages.setdefault(stage, {'calls': 0, 'symbols': 0, 'seconds': 0.0, 'max': 0.0})
+            entry['calls'] += 1
+            entry['symbols'] += symbols
+            entry['seconds'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+
+    def incr(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {'stages': {k: dict(v) for k, v in self.stages.items()}, 'counters': dict(self.counters)}
+
+    def merge(self, snapshot: dict):
+        """
+        Add a snapshot taken elsewhere, e.g. in a worker process, to these metrics.
+        """
+        with self._lock:
+            for stage, other in snapshot['stages'].items():
+                entry = self.stages.setdefault(stage, {'calls': 0, 'symbols': 0, 'seconds': 0.0, 'max': 0.0})
+                for key in ('calls', 'symbols', 'seconds'):
+                    entry[key] += other[key]
+                entry['max'] = max(entry['max'], other['max'])
+            for name, n in snapshot['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self) -> pd.DataFrame:
+        """
+        One row per stage: calls, symbols, total/mean/max seconds and milliseconds per symbol.
+        """
+        rows = []
+        for stage, entry in self.snapshot()['stages'].items():
+            rows.append({
+                'Stage': stage, 'Calls': entry['calls'], 'Symbols': entry['symbols'],
+                'Total (s)': entry['seconds'], 'Mean (s)': entry['seconds'] / entry['calls'],
+                'Max (s)': entry['max'],
+                'Per Symbol (ms)': entry['seconds'] / entry['symbols'] * 1000 if entry['symbols'] else None,
+            })
+        columns = ['Stage', 'Calls', 'Symbols', 'Total (s)', 'Mean (s)', 'Max (s)', 'Per Symbol (ms)']
+        return pd.DataFrame(rows, columns=columns).sort_values('Total (s)', ascending=False, ignore_index=True)
+
+    def write_json_lines(self, path: str):
+        """
+        Append one JSON record per stage and per counter, stamped with the current time.
+        """
+        now = time.time()
+        snapshot = self.snapshot()
+        with open(path, 'a') as f:
+            for stage, entry in snapshot['stages'].items():
+                f.write(json.dumps({'time': now, 'type': 'stage', 'name': stage, **entry}) + "\n")
+            for name, value in snapshot['counters'].items():
+                f.write(json.dumps({'time': now, 'type': 'counter', 'name': name, 'value': value}) + "\n")
+
+    def write_prometheus(self, path: str, prefix: str = "scanner"):
+        """
+        Write the metrics in the Prometheus text format, e.g. for node_exporter's textfile collector.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for metric, key, kind in (('stage_seconds_total', 'seconds', 'counter'),
+                                  ('stage_calls_total', 'calls', 'counter'),
+                                  ('stage_symbols_total', 'symbols', 'counter'),
+                                  ('stage_max_seconds', 'max', 'gauge')):
+            lines.append(f"# TYPE {prefix}_{metric} {kind}")
+            lines += [f'{prefix}_{metric}{{stage="{stage}"}} {entry[key]}' for stage, entry in snapshot['stages'].items()]
+        for name, value in snapshot['counters'].items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        with open(path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+
+    def export(self, path: str):
+        """
+        Write to `path` as Prometheus text (.prom) or JSON lines (anything else).
+        """
+        if path.endswith('.prom'):
+            self.write_prometheus(path)
+        else:
+            self.write_json_lines(path)
+
+
+class _ActiveMetrics:
+    def __init__(self):
+        self.default = Metrics()
+
+    def __getattr__(self, name):
+        return getattr(_active.get(self.default), name)
+
+
+METRICS = _ActiveMetrics()
@@ -0,0 +1,137 @@
+import itertools
+import math
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from bararray import BarArray
+from backtest import HORIZONS, date_mask, forward_outcomes
+from indicators import IndicatorCache, price_matrices
+from strategies import get_strategy, fired
+from metrics import METRICS
+
+
+def parse_grid(text: str):
+    """
+    Parse a grid such as "macd fast=8,12,16 slow=20:30:5" into the strategy key and
+    {param: [values]}. Values are comma-separated or an inclusive start:stop:step range.
+    """
+    key, *items = text.split()
+    grid = {}
+    for item in items:
+        name, sep, values = item.partition('=')
+        if not sep or not values:
+            raise ValueError(f"Expected param=values in grid '{text}', got '{item}'")
+        if ':' in values:
+            start, stop, step = (_number(v) for v in values.split(':'))
+            count = int(math.floor((stop - start) / step + 1e-9)) + 1
+            grid[name] = [start + i * step for i in range(max(count, 0))]
+        else:
+            grid[name] = [_number(v) for v in values.split(',')]
+    return key, grid
+
+
+def _number(text: str):
+    value = float(text)
+    return int(value) if value.is_integer() and '.' not in text else value
+
+
+def expand_grid(key: str, grid: dict) -> list:
+    """
+    One strategy per combination of the grid's values; parameters not in the grid keep their defaults.
+    """
+    names = list(grid)
+    return [get_strategy(key, **dict(zip(names, values))) for values in itertools.product(*grid.values())]
+
+
+def _sweep_strategies(data, strategies: list, start, end, horizons: tuple) -> list:
+    """
+    Signal count, hit rate, average return per horizon and drawdown of each strategy over `data`.
+
+    Strategies run in the given order on one `IndicatorCache`, so combinations sharing an EMA
+    span, rolling window or ATR period compute it once; an indicator is released as soon as
+    the next strategy no longer needs it, keeping memory flat over long sweeps.
+    """
+    dates, symbols, bars = price_matrices(data, columns=('Close', 'Low'))
+    if not symbols:
+        return []
+    ind = IndicatorCache(bars['Close'], dates=dates)
+    returns, drawdown = forward_outcomes(bars['Close'], bars['Low'], horizons)
+    in_range = date_mask(dates, start, end)[:, None]
+
+    rows = []
+    for strategy, following in zip(strategies, strategies[1:] + [None]):
+        with METRICS.timer('sweep_combination', len(symbols)):
+            signals = (ind.expand(fired(strategy, ind)) == 1) & in_range
+            row = {'Strategy': strategy.name, 'Key': strategy.key,
+                   'Parameters': ", ".join(f"{k}={v}" for k, v in strategy.params.items()),
+                   'Signals': int(signals.sum())}
+            for h in horizons:
+                outcome = returns[h][signals]
+                outcome = outcome[~np.isnan(outcome)]
+                row[f'Hit Rate {h}D (%)'] = (outcome > 0).mean() * 100 if len(outcome) else np.nan
+                row[f'Avg Return {h}D (%)'] = outcome.mean() if len(outcome) else np.nan
+            worst = drawdown[signals]
+            worst = worst[~np.isnan(worst)]
+            row['Avg Drawdown (%)'] = worst.mean() if len(worst) else np.nan
+            row['Worst Drawdown (%)'] = worst.min() if len(worst) else np.nan
+            rows.append(row)
+        for spec in set(strategy.indicators) - set(following.indicators if following else []):
+            ind.release(spec)
+    return rows
+
+
+def _sweep_chunk(path: str, strategies: list, start, end, horizons: tuple):
+    """
+    Process-pool task: sweep `strategies` over the memory-mapped `BarArray` at `path`.
+    """
+    METRICS.reset()
+    rows = _sweep_strategies(BarArray.load(path, mmap=True), strategies, start, end, horizons)
+    return rows, METRICS.snapshot()
+
+
+def sweep(data, strategies: list, start=None, end=None, horizons: tuple = HORIZONS,
+          workers: int = 1, rank_horizon: int = None, min_signals: int = 1) -> pd.DataFrame:
+    """
+    Backtest every strategy (typically the combinations from `expand_grid`) over `data`, a
+    `BarArray` or `{symbol: DataFrame}`, and rank them.
+
+    Strategies are ordered by the indicators they need and split into one contiguous block per
+    worker, so each process shares as many computations as possible; with several `workers` the
+    bars are saved once and memory-mapped by every process. Returns one row per strategy, best
+    first by hit rate and then average return at `rank_horizon` (default: the shortest horizon);
+    strategies with fewer than `min_signals` signals rank last.
+    """
+    horizons = tuple(sorted(horizons))
+    rank_horizon = rank_horizon or horizons[0]
+    strategies = sorted(strategies, key=lambda s: (s.key, [repr(spec) for spec in s.indicators]))
+    workers = max(min(workers or os.cpu_count(), len(strategies)), 1)
+
+    if workers > 1 and not isinstance(data, BarArray):
+        data = BarArray.from_frames(data)
+    if workers == 1:
+        rows = _sweep_strategies(data, strategies, start, end, horizons)
+    else:
+        size = math.ceil(len(strategies) / workers)
+        blocks = [strategies[i:i + size] for i in range(0, len(strategies), size)]
+        rows = []
+        with tempfile.TemporaryDirectory() as shared_dir:
+            data.save(shared_dir)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_sweep_chunk, shared_dir, block, start, end, horizons)
+                           for block in blocks]
+                for future in futures:
+                    block_rows, worker_metrics = future.result()
+                    METRICS.merge(worker_metrics)
+                    rows += block_rows
+
+    columns = (['Strategy', 'Key', 'Parameters', 'Signals']
+               + [f'{stat} {h}D (%)' for h in horizons for stat in ('Hit Rate', 'Avg Return')]
+               + ['Avg Drawdown (%)', 'Worst Drawdown (%)'])
+    result = pd.DataFrame(rows, columns=columns)
+    result['Enough Signals'] = result['Signals'] >= min_signals
+    result = result.sort_values(['Enough Signals', f'Hit Rate {rank_horizon}D (%)', f'Avg Return {rank_horizon}D (%)'],
+                                ascending=False, na_position='last', ignore_index=True)
+    result.insert(0, 'Rank', np.arange(1, len(result) + 1))
+    return result.drop(columns='Enough Signals').round(2)
@@ -0,0 +1,166 @@
+import contextvars
+import math
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from utils import RateLimiter
+from store import BARS_DB, BarStore, load_bars, refresh_bars, stale_symbols
+from strategies import evaluate
+from metrics import METRICS
+from bararray import BarArray
+from scancache import ScanCache
+
+
+def detect_signals(data: dict, strategies: list, as_of=None) -> list:
+    """
+    Evaluate `strategies` over `data` and return one record per symbol where any of them fired.
+    """
+    with METRICS.timer('detect', len(data)):
+        result = evaluate(data, strategies, as_of)
+        names = [s.name for s in strategies]
+        return result[result[names].any(axis=1)].to_dict('records')
+
+
+def scan_stream(symbols: list, strategies: list, interval: str = '1d', as_of=None, chunk_size: int = 25,
+                max_workers: int = 4, cancel: threading.Event = None, load=load_bars, errors: list = None):
+    """
+    Scan `symbols` for all `strategies` in chunks on a bounded thread pool, fetching and
+    evaluating chunks concurrently; each symbol is fetched once whatever the number of strategies.
+
+    Yields `(symbols_done, matches)` as each chunk finishes, in completion order, so callers can
+    show matches before the whole group is scanned. Setting `cancel`, or closing the generator,
+    skips every chunk that has not started yet. Chunks that fail still count as done, with no
+    matches; their symbols, and those the provider failed on, are appended to `errors` when given.
+    """
+    cancel = cancel or threading.Event()
+    rate_limiter = RateLimiter()
+    chunks = [list(symbols[i:i + chunk_size]) for i in range(0, len(symbols), chunk_size)]
+
+    def work(chunk):
+        if cancel.is_set():
+            return chunk, []
+        try:
+            with METRICS.timer('scan_chunk', len(chunk)):
+                data = load(chunk, interval=interval, rate_limiter=rate_limiter, failed=errors)
+                if cancel.is_set():
+                    return chunk, []
+                return chunk, detect_signals(data, strategies, as_of)
+        except Exception as e:
+            METRICS.incr('scan_errors')
+            print(f"Scan failed for {len(chunk)} symbols starting at {chunk[0]}: {e}")
+            if errors is not None:
+                errors.extend(chunk)
+            return chunk, []
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        # Run each chunk in this context so it records into the caller's active metrics.
+        futures = [executor.submit(contextvars.copy_context().run, work, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            if cancel.is_set():
+                break
+            chunk, matches = future.result()
+            yield len(chunk), matches
+    finally:
+        cancel.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _scan_chunk(chunk: list, strategies: list, interval: str, as_of, store_path: str, shared_path: str = None):
+    """
+    Process-pool task: read one chunk's bars straight from the store (or from the memory-mapped
+    `BarArray` at `shared_path`) and return only its matches (None if the chunk failed), plus the
+    metrics the task recorded in the worker process.
+    """
+    METRICS.reset()
+    try:
+        with METRICS.timer('scan_chunk', len(chunk)):
+            if shared_path:
+                data = BarArray.load(shared_path, mmap=True).select(chunk)
+            else:
+                data = BarStore(store_path).read_many(chunk, interval)
+                # The store returns symbols sorted; keep the chunk's order so output is deterministic.
+                data = {s: data[s] for s in chunk if s in data}
+            matches = detect_signals(data, strategies, as_of)
+    except Exception as e:
+        METRICS.incr('scan_errors')
+        print(f"Scan failed for {len(chunk)} symbols starting at {chunk[0]}: {e}")
+        matches = None
+    return matches, METRICS.snapshot()
+
+
+def scan_parallel(symbols: list, strategies: list, interval: str = '1d', as_of=None, workers: int = None,
+                  chunk_size: int = None, store_path: str = BARS_DB, refresh: bool = True, shared: bool = False,
+                  errors: list = None):
+    """
+    Scan `symbols` on a process pool so indicator work runs on every core.
+
+    The store is topped up once in this process (unless `refresh` is False); each worker then
+    reads its chunk from the on-disk store itself, so no bars are pickled between processes and
+    only the match records come back. With `shared`, the bars are instead read once into a
+    `BarArray` saved to a temporary directory, which every worker memory-maps.
+    Yields `(symbols_done, matches)` like `scan_stream`, but always in input order, so results
+    are the same whatever the number of workers. Symbols of failed chunks, and those the provider
+    failed on, are appended to `errors`.
+    """
+    workers = workers or os.cpu_count()
+    if refresh:
+        refresh_bars(symbols, interval, store=BarStore(store_path), failed=errors)
+    # A few chunks per worker keeps the pool busy when chunks take uneven time.
+    chunk_size = chunk_size or max(math.ceil(len(symbols) / (workers * 4)), 1)
+    chunks = [list(symbols[i:i + chunk_size]) for i in range(0, len(symbols), chunk_size)]
+
+    shared_dir = tempfile.TemporaryDirectory() if shared else None
+    if shared:
+        BarStore(store_path).read_array(symbols, interval).save(shared_dir.name)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [executor.submit(_scan_chunk, chunk, strategies, interval, as_of, store_path,
+                                   shared_dir.name if shared else None) for chunk in chunks]
+        for chunk, future in zip(chunks, futures):
+            matches, worker_metrics = future.result()
+            METRICS.merge(worker_metrics)
+            if matches is None:
+                matches = []
+                if errors is not None:
+                    errors.extend(chunk)
+            yield len(chunk), matches
+    finally:
+        executor.shutdown(wait=shared, cancel_futures=True)
+        if shared:
+            shared_dir.cleanup()
+
+
+def scan_cached(symbols: list, strategies: list, interval: str = '1d', as_of=None, group: str = '',
+                cache: ScanCache = None, max_age: float = 900, scan=scan_stream, **kwargs):
+    """
+    `scan` (`scan_stream` by default, or `scan_parallel`) behind the on-disk `ScanCache`.
+
+    The cache key includes every member's latest stored bar, so it is only looked up when every
+    member was refreshed within `max_age` seconds: a hit is yielded as a single
+    `(len(symbols), matches)` step. Otherwise the scan streams straight away, topping up the store
+    chunk by chunk, and its matches are stored under the key of the bars it ended with, unless
+    it was cancelled or a chunk or provider request failed. Empty groups bypass the cache.
+    """
+    cache = cache or ScanCache()
+    store = BarStore()
+    if symbols and not stale_symbols(symbols, interval, max_age, store):
+        with METRICS.timer('scan_cache_lookup', len(symbols)):
+            # Nothing to download; this only brings derived weekly/monthly bars up to date.
+            refresh_bars(symbols, interval, max_age=max_age, store=store)
+            key = cache.key(group, symbols, strategies, interval, as_of, store.last_bars(symbols, interval))
+            matches = cache.get(key)
+        if matches is not None:
+            METRICS.incr('scan_cache_hits')
+            yield len(symbols), matches
+            return
+    METRICS.incr('scan_cache_misses')
+    matches, done, errors = [], 0, []
+    for count, chunk_matches in scan(symbols, strategies, interval=interval, as_of=as_of, errors=errors, **kwargs):
+        done += count
+        matches += chunk_matches
+        yield count, chunk_matches
+    if symbols and done == len(symbols) and not errors:
+        key = cache.key(group, symbols, strategies, interval, as_of, store.last_bars(symbols, interval))
+        cache.put(key, matches, description=f"{group} {interval} {', '.join(s.name for s in strategies)}")
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+SCAN_CACHE_DB = "scan_cache.db"
+
+
+class ScanCache:
+    """
+    On-disk cache of scan results shared by every session and process, evicting the least
+    recently used entries beyond `max_entries` or `max_bytes`.
+
+    Keys (see `key`) include the last stored bar of every member symbol, so an entry simply
+    stops matching once new bars land and is later evicted.
+    """
+
+    def __init__(self, path: str = SCAN_CACHE_DB, max_entries: int = 500, max_bytes: int = 50 * 1024 * 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS scan_cache (
+                key TEXT PRIMARY KEY,
+                description TEXT,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                size INTEGER NOT NULL,
+                payload TEXT NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_scan_cache_used ON scan_cache (last_used)")
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def key(group: str, symbols: list, strategies: list, interval: str, as_of, last_bars: dict) -> str:
+        """
+        Hash of everything a scan result depends on: the group and its members, each strategy with
+        its parameters, the interval, the as-of date and the last stored bar (date, close) per symbol.
+        """
+        parts = {
+            'group': group,
+            'symbols': list(symbols),
+            'strategies': [[s.key, sorted(s.params.items())] for s in strategies],
+            'interval': interval,
+            'as_of': str(as_of) if as_of else None,
+            'bars': sorted([symbol, str(date), close] for symbol, (date, close) in last_bars.items()),
+        }
+        return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+
+    def get(self, key: str):
+        """
+        The cached matches for `key`, or None on a miss.
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT payload FROM scan_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE scan_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            conn.commit()
+            return json.loads(row[0])
+        finally:
+            conn.close()
+
+    def put(self, key: str, matches: list, description: str = ''):
+        payload = json.dumps(matches, default=_to_json)
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("""
+                INSERT OR REPLACE INTO scan_cache (key, description, created_at, last_used, size, payload)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (key, description, now, now, len(payload), payload))
+            self._evict(conn)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def clear(self):
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM scan_cache")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection):
+        # Walk entries from most to least recently used and drop everything past either limit.
+        rows = conn.execute("SELECT key, size FROM scan_cache ORDER BY last_used DESC").fetchall()
+        total, stale = 0, []
+        for i, (key, size) in enumerate(rows):
+            total += size
+            if i >= self.max_entries or total > self.max_bytes:
+                stale.append((key,))
+        conn.executemany("DELETE FROM scan_cache WHERE key = ?", stale)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+
+def _to_json(value):
+    # numpy scalars in match records
+    return value.item() if hasattr(value, 'item') else str(value)
@@ -0,0 +1,215 @@
+"""
+Headless entry point for scheduled and batch scans, e.g.
+
+    python -m scanner scan --group "Nifty 500" --strategy macd --interval daily --output scans/nifty500.csv
+
+Uses the same bar store, strategies and signal database as the Streamlit app without importing
+Streamlit or Altair. `scan` exits with 0 when something matched, 1 when nothing did and 2 on errors.
+"""
+import argparse
+import os
+import sys
+import pandas as pd
+from utils import MARKET_GROUPS, load_group_symbols
+from universe import get_universe
+from pipeline import scan_cached, scan_parallel, scan_stream
+from store import BarStore, load_bar_array
+from optimizer import expand_grid, parse_grid, sweep
+from strategies import STRATEGIES, get_strategy, output_columns
+from db import create_db, insert_signals, update_signal_prices
+from metrics import METRICS
+from backtest import HORIZONS
+
+EXIT_MATCHES = 0
+EXIT_NO_MATCHES = 1
+EXIT_ERROR = 2
+
+INTERVALS = {'daily': ('1d', "Daily"), 'weekly': ('1wk', "Weekly"), 'monthly': ('1mo', "Monthly")}
+
+
+def write_results(df: pd.DataFrame, path: str):
+    """
+    Write scan results to `path`, picking CSV, JSON or Parquet from its extension.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    if ext == '.csv':
+        df.to_csv(path, index=False)
+    elif ext == '.json':
+        df.to_json(path, orient='records', date_format='iso', indent=2)
+    elif ext in ('.parquet', '.pq'):
+        df.to_parquet(path, index=False)
+    else:
+        raise ValueError(f"Unsupported output format '{ext}', expected .csv, .json or .parquet")
+
+
+def run_scan(market: str, groups: list, strategy_keys: list, interval: str = 'daily', as_of=None,
+             max_workers: int = 4, processes: int = 0, shared: bool = False, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Scan every symbol of `groups` for `strategy_keys` and return the matches, one row per
+    (group, symbol) in group order, with a boolean column per strategy name. With `processes`,
+    indicators are computed on a process pool of that size instead of the fetch threads, and
+    `shared` has the workers memory-map one copy of the bars instead of each reading the store.
+    Unless `use_cache` is False, results come from the scan cache when no member has a new bar.
+    """
+    strategies = [get_strategy(key) for key in strategy_keys]
+    frames = []
+    for group in groups:
+        symbols = load_group_symbols(market, group)
+        if not symbols:
+            raise ValueError(f"No symbols found for group '{group}'")
+        matches = []
+        if processes:
+            scan, options = scan_parallel, {'workers': processes, 'shared': shared}
+        else:
+            scan, options = scan_stream, {'max_workers': max_workers}
+        if use_cache:
+            stream = scan_cached(symbols, strategies, interval=INTERVALS[interval][0], as_of=as_of,
+                                 group=f"{market}:{group}", scan=scan, **options)
+        else:
+            stream = scan(symbols, strategies, interval=INTERVALS[interval][0], as_of=as_of, **options)
+        for _, chunk_matches in stream:
+            matches += chunk_matches
+        order = {symbol: i for i, symbol in enumerate(symbols)}
+        matches.sort(key=lambda match: order[match['Symbol']])
+        columns = ['Symbol', 'Price', 'Price Then'] + [s.name for s in strategies] + output_columns(strategies)
+        df = pd.DataFrame(matches, columns=columns)
+        df.insert(0, 'Group', group)
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def cmd_scan(args) -> int:
+    groups = args.group or MARKET_GROUPS[args.market]
+    strategy_keys = args.strategy or ['macd']
+    results = run_scan(args.market, groups, strategy_keys, args.interval, args.as_of, args.workers,
+                       args.processes, args.shared_memory, not args.no_cache)
+    names = [STRATEGIES[key].name for key in strategy_keys]
+
+    if args.output:
+        write_results(results, args.output)
+    else:
+        print(results.to_string(index=False) if not results.empty else "No matches.")
+
+    # Backtest scans (--as-of) are not live signals, so they are never logged.
+    if not args.no_db and not args.as_of and not results.empty:
+        label = INTERVALS[args.interval][1]
+        create_db()
+        rows = [(row['Symbol'], row['Price'], name, label)
+                for row in results.drop_duplicates('Symbol').to_dict('records') for name in names if row[name]]
+        inserted = insert_signals(rows)
+        print(f"Logged {inserted} new signals to the signal database.", file=sys.stderr)
+
+    print(f"{results['Symbol'].nunique()} symbols matched across {len(groups)} groups.", file=sys.stderr)
+    if args.metrics:
+        METRICS.export(args.metrics)
+    return EXIT_MATCHES if not results.empty else EXIT_NO_MATCHES
+
+
+def cmd_sweep(args) -> int:
+    symbols = load_group_symbols(args.market, args.group)
+    if not symbols:
+        raise ValueError(f"No symbols found for group '{args.group}'")
+    strategies = []
+    for text in args.grid:
+        strategies += expand_grid(*parse_grid(text))
+    interval = INTERVALS[args.interval][0]
+    data = BarStore().read_array(symbols, interval) if args.offline else load_bar_array(symbols, interval)
+    print(f"Sweeping {len(strategies)} combinations over {len(data)} symbols.", file=sys.stderr)
+    results = sweep(data, strategies, args.start, args.end, tuple(args.horizon or HORIZONS),
+                    args.processes, args.rank_horizon, args.min_signals)
+
+    if args.output:
+        write_results(results, args.output)
+    else:
+        print(results.head(args.top).to_string(index=False))
+    if args.metrics:
+        METRICS.export(args.metrics)
+    return EXIT_MATCHES if (results['Signals'] > 0).any() else EXIT_NO_MATCHES
+
+
+def cmd_groups(args) -> int:
+    for market, groups in MARKET_GROUPS.items():
+        if args.market in (None, market):
+            for group in groups:
+                print(f"{market}\t{group}")
+    if args.market in (None, "India"):
+        for name in sorted(get_universe().industries):
+            print(f"India\tIndustry: {name}")
+    return EXIT_MATCHES
+
+
+def cmd_update_prices(args) -> int:
+    create_db()
+    print(f"Prices updated for {update_signal_prices()} pending signals.")
+    return EXIT_MATCHES
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m scanner", description="Headless technical signal scanner.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scan = commands.add_parser('scan', help="Scan one or more groups and log the signals.")
+    scan.add_argument('--market', choices=list(MARKET_GROUPS), default="India")
+    scan.add_argument('--group', action='append',
+                      help="Group to scan, e.g. \"Nifty 500 - Nifty 100\" or \"Industry: Realty\"; repeat for several. "
+                           "Defaults to every group of the market.")
+    scan.add_argument('--strategy', action='append', choices=list(STRATEGIES),
+                      help="Strategy key to scan for; repeat for several. Defaults to macd.")
+    scan.add_argument('--interval', choices=list(INTERVALS), default='daily')
+    scan.add_argument('--as-of', help="Evaluate on the last bar on or before this date (YYYY-MM-DD).")
+    scan.add_argument('--output', help="Write matches to a .csv, .json or .parquet file instead of stdout.")
+    scan.add_argument('--no-db', action='store_true', help="Do not log the signals to the signal database.")
+    scan.add_argument('--workers', type=int, default=4, help="Chunks fetched and evaluated concurrently.")
+    scan.add_argument('--processes', type=int, default=0,
+                      help="Evaluate on a pool of this many processes reading from the bar store (0: threads only).")
+    scan.add_argument('--shared-memory', action='store_true',
+                      help="With --processes, share one memory-mapped copy of the bars between the workers.")
+    scan.add_argument('--no-cache', action='store_true', help="Always rescan instead of reusing cached results.")
+    scan.add_argument('--metrics', help="Export stage timings and counters to a .prom (Prometheus text) "
+                                        "or .jsonl (JSON lines, appended) file.")
+    scan.set_defaults(func=cmd_scan)
+
+    sweep_cmd = commands.add_parser('sweep', help="Rank strategy parameter combinations over stored history.")
+    sweep_cmd.add_argument('--market', choices=list(MARKET_GROUPS), default="India")
+    sweep_cmd.add_argument('--group', default="Nifty 200", help="Group expression whose history is swept.")
+    sweep_cmd.add_argument('--grid', action='append', required=True,
+                           help="Strategy key and parameter values, e.g. \"macd fast=8,12,16 slow=20:30:2\" "
+                                "(start:stop:step is inclusive); repeat for several strategies.")
+    sweep_cmd.add_argument('--interval', choices=list(INTERVALS), default='daily')
+    sweep_cmd.add_argument('--start', help="First signal date to count (YYYY-MM-DD).")
+    sweep_cmd.add_argument('--end', help="Last signal date to count (YYYY-MM-DD).")
+    sweep_cmd.add_argument('--horizon', type=int, action='append',
+                           help="Forward-return horizon in bars; repeat for several. Defaults to 5, 10 and 20.")
+    sweep_cmd.add_argument('--rank-horizon', type=int, help="Horizon to rank by (default: the shortest).")
+    sweep_cmd.add_argument('--min-signals', type=int, default=20,
+                           help="Combinations with fewer signals are ranked last.")
+    sweep_cmd.add_argument('--processes', type=int, default=os.cpu_count(), help="Worker processes.")
+    sweep_cmd.add_argument('--offline', action='store_true',
+                           help="Use only the bars already in the store, without topping it up.")
+    sweep_cmd.add_argument('--top', type=int, default=20, help="Rows printed without --output.")
+    sweep_cmd.add_argument('--output', help="Write every combination to a .csv, .json or .parquet file.")
+    sweep_cmd.add_argument('--metrics', help="Export stage timings and counters to a .prom or .jsonl file.")
+    sweep_cmd.set_defaults(func=cmd_sweep)
+
+    groups = commands.add_parser('groups', help="List the groups that can be scanned.")
+    groups.add_argument('--market', choices=list(MARKET_GROUPS))
+    groups.set_defaults(func=cmd_groups)
+
+    update = commands.add_parser('update-prices', help="Fill in 5/10-day outcomes of pending signals.")
+    update.set_defaults(func=cmd_update_prices)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    sys.exit(main())
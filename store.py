@@ -0,0 +1,336 @@
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+from utils import fetch_bulk_data
+from metrics import METRICS
+from bararray import BAR_COLUMNS, BarArray
+from timeframes import DERIVED_INTERVALS, period_start, resample_bars
+
+BARS_DB = "bars.db"
+# Relative change in an already stored close that means the provider re-adjusted the history
+# (split or dividend) rather than rounded differently.
+ADJUSTMENT_TOLERANCE = 1e-4
+
+
+class BarStore:
+    """
+    Persistent per-symbol OHLCV store backed by SQLite.
+    """
+
+    def __init__(self, path: str = BARS_DB):
+        self.path = path
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS bars (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                date TEXT NOT NULL,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL NOT NULL,
+                volume REAL,
+                PRIMARY KEY (symbol, interval, date)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS refresh_log (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                refreshed_at REAL NOT NULL,
+                PRIMARY KEY (symbol, interval)
+            )
+        """)
+        if conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            # Weekly and monthly bars used to be downloaded (dated on the period's first day);
+            # they are now derived from the daily bars, so drop the downloaded ones.
+            placeholders = ",".join("?" * len(DERIVED_INTERVALS))
+            conn.execute(f"DELETE FROM bars WHERE interval IN ({placeholders})", DERIVED_INTERVALS)
+            conn.execute(f"DELETE FROM refresh_log WHERE interval IN ({placeholders})", DERIVED_INTERVALS)
+            conn.execute("PRAGMA user_version = 1")
+        conn.commit()
+        conn.close()
+
+    def last_bar_dates(self, symbols: list, interval: str) -> dict:
+        """
+        Date of the newest stored bar for each symbol that has any.
+        """
+        rows = self._select_in("""
+            SELECT symbol, MAX(date) FROM bars
+            WHERE interval = ? AND symbol IN ({}) GROUP BY symbol
+        """, interval, symbols)
+        return {symbol: pd.Timestamp(date) for symbol, date in rows}
+
+    def last_bars(self, symbols: list, interval: str) -> dict:
+        """
+        (date, close) of the newest stored bar for each symbol that has any.
+        """
+        rows = self._select_in("""
+            SELECT symbol, MAX(date), close FROM bars
+            WHERE interval = ? AND symbol IN ({}) GROUP BY symbol
+        """, interval, symbols)
+        return {symbol: (date, close) for symbol, date, close in rows}
+
+    def settled_bars(self, symbols: list, interval: str) -> dict:
+        """
+        (date, close) of the second newest stored bar for each symbol that has one: the newest bar
+        known to have been complete when it was stored.
+        """
+        # One primary-key lookup per symbol; a window over all their bars is far slower.
+        conn = self._connect()
+        try:
+            rows = [(symbol, conn.execute("""
+                SELECT date, close FROM bars WHERE symbol = ? AND interval = ?
+                ORDER BY date DESC LIMIT 1 OFFSET 1
+            """, (symbol, interval)).fetchone()) for symbol in symbols]
+        finally:
+            conn.close()
+        return {symbol: tuple(row) for symbol, row in rows if row}
+
+    def refreshed_at(self, symbols: list, interval: str) -> dict:
+        rows = self._select_in("""
+            SELECT symbol, refreshed_at FROM refresh_log
+            WHERE interval = ? AND symbol IN ({})
+        """, interval, symbols)
+        return dict(rows)
+
+    def read(self, symbol: str, interval: str) -> pd.DataFrame:
+        return self.read_many([symbol], interval).get(symbol, pd.DataFrame())
+
+    def read_many(self, symbols: list, interval: str) -> dict:
+        """
+        Load stored bars for `symbols` as one DataFrame per symbol, oldest bar first.
+        """
+        with METRICS.timer('store_read', len(symbols)):
+            rows = self._select_in("""
+                SELECT symbol, date, open, high, low, close, volume FROM bars
+                WHERE interval = ? AND symbol IN ({}) ORDER BY symbol, date
+            """, interval, symbols)
+            METRICS.incr('bars_read', len(rows))
+            if not rows:
+                return {}
+            df = pd.DataFrame(rows, columns=['Symbol', 'Date'] + BAR_COLUMNS)
+            df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d')
+            df[BAR_COLUMNS] = df[BAR_COLUMNS].astype(float)
+            return {symbol: group.drop(columns='Symbol').reset_index(drop=True)
+                    for symbol, group in df.groupby('Symbol', sort=False)}
+
+    def read_frame(self, symbols: list, interval: str, start=None) -> pd.DataFrame:
+        """
+        Stored bars for `symbols` (from `start` on, if given) as one long frame with a Symbol
+        column, sorted by symbol and date.
+        """
+        since = "" if start is None else f"AND date >= '{pd.Timestamp(start):%Y-%m-%d}'"
+        with METRICS.timer('store_read', len(symbols)):
+            rows = self._select_in(f"""
+                SELECT symbol, date, open, high, low, close, volume FROM bars
+                WHERE interval = ? AND symbol IN ({{}}) {since} ORDER BY symbol, date
+            """, interval, symbols)
+            METRICS.incr('bars_read', len(rows))
+            df = pd.DataFrame(rows, columns=['Symbol', 'Date'] + BAR_COLUMNS)
+            df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d')
+            df[BAR_COLUMNS] = df[BAR_COLUMNS].astype(float)
+            return df
+
+    def read_array(self, symbols: list, interval: str, dtype=np.float64) -> BarArray:
+        """
+        Load stored bars for `symbols` straight into one columnar `BarArray`, without per-symbol frames.
+        """
+        with METRICS.timer('store_read', len(symbols)):
+            rows = self._select_in("""
+                SELECT symbol, date, open, high, low, close, volume FROM bars
+                WHERE interval = ? AND symbol IN ({})
+            """, interval, symbols)
+            METRICS.incr('bars_read', len(rows))
+            if not rows:
+                return BarArray.from_frames({}, dtype=dtype)
+            df = pd.DataFrame(rows, columns=['Symbol', 'Date'] + BAR_COLUMNS)
+            dates = pd.to_datetime(df['Date'], format='%Y-%m-%d')
+            values = {c: df[c].to_numpy(dtype=float, na_value=np.nan) for c in BAR_COLUMNS}
+            return BarArray.from_long(df['Symbol'].to_numpy(), dates, values, symbols, dtype)
+
+    def write(self, symbol: str, interval: str, df: pd.DataFrame):
+        self.write_many({symbol: df}, interval)
+
+    def write_many(self, data: dict, interval: str, since=None):
+        """
+        Upsert bars for several symbols and stamp them as refreshed now.
+        With `since`, their stored bars from that date on are replaced instead of upserted.
+        """
+        frames = [df.reindex(columns=['Date'] + BAR_COLUMNS).assign(Symbol=symbol, Interval=interval)
+                  for symbol, df in data.items()]
+        records = []
+        if frames:
+            bars = pd.concat(frames, ignore_index=True)
+            bars['Date'] = pd.to_datetime(bars['Date']).dt.strftime('%Y-%m-%d')
+            bars = bars[['Symbol', 'Interval', 'Date'] + BAR_COLUMNS].astype(object)
+            records = list(bars.where(bars.notna(), None).itertuples(index=False, name=None))
+        now = time.time()
+        conn = self._connect()
+        try:
+            with METRICS.timer('store_write', len(data)):
+                if since is not None:
+                    conn.executemany("DELETE FROM bars WHERE symbol = ? AND interval = ? AND date >= ?",
+                                     [(symbol, interval, f"{pd.Timestamp(since):%Y-%m-%d}") for symbol in data])
+                conn.executemany("""
+                    INSERT OR REPLACE INTO bars (symbol, interval, date, open, high, low, close, volume)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, records)
+                conn.executemany("""
+                    INSERT OR REPLACE INTO refresh_log (symbol, interval, refreshed_at) VALUES (?, ?, ?)
+                """, [(symbol, interval, now) for symbol in data])
+                conn.commit()
+            METRICS.incr('bars_written', len(records))
+        finally:
+            conn.close()
+
+    def delete(self, symbols: list, intervals: list):
+        """
+        Drop every stored bar of `symbols` in `intervals`.
+        """
+        conn = self._connect()
+        try:
+            conn.executemany("DELETE FROM bars WHERE symbol = ? AND interval = ?",
+                             [(symbol, interval) for symbol in symbols for interval in intervals])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Scan workers read and write from several threads; wait for the lock instead of failing.
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _select_in(self, sql: str, interval: str, symbols: list, chunk_size: int = 500) -> list:
+        rows = []
+        conn = self._connect()
+        try:
+            for i in range(0, len(symbols), chunk_size):
+                chunk = list(symbols[i:i + chunk_size])
+                query = sql.format(",".join("?" * len(chunk)))
+                rows.extend(conn.execute(query, [interval] + chunk).fetchall())
+        finally:
+            conn.close()
+        return rows
+
+
+def stale_symbols(symbols: list, interval: str = '1d', max_age: float = 900, store: BarStore = None) -> list:
+    """
+    Symbols `refresh_bars` would ask the provider about: those not refreshed in the last `max_age`
+    seconds (judged on their daily bars for derived weekly/monthly intervals).
+    """
+    store = store or BarStore()
+    if interval in DERIVED_INTERVALS:
+        interval = '1d'
+    now = time.time()
+    refreshed_at = store.refreshed_at(symbols, interval)
+    return [s for s in symbols if now - refreshed_at.get(s, 0) >= max_age]
+
+
+def refresh_bars(symbols: list, interval: str = '1d', history: str = "5y", max_age: float = 900,
+                 store: BarStore = None, provider=None, rate_limiter=None, failed: list = None):
+    """
+    Top up the on-disk store for `symbols` from the provider without reading the bars back.
+
+    Symbols with no stored bars get a full `history` download. Stored symbols are only asked
+    for bars from their second newest stored bar onward (the newest is refetched because it may
+    have been incomplete), and not at all if they were refreshed less than `max_age` seconds ago.
+    The provider returns split- and dividend-adjusted prices, so when the refetched close of that
+    second newest bar no longer matches the stored one, the history was re-adjusted: the symbol's
+    full `history` is downloaded again and replaces its stored (and derived) bars.
+    Only symbols the provider returned bars for are stamped as refreshed, so those it failed on
+    (e.g. during an outage) are asked again on the next call; symbols of requests that failed
+    are appended to `failed` (see `fetch_bulk_data`).
+    Weekly and monthly bars are never downloaded: the daily bars are topped up and the
+    `interval` bars derived from them (see `derive_bars`).
+    """
+    store = store or BarStore()
+    if interval in DERIVED_INTERVALS:
+        refresh_bars(symbols, '1d', history, max_age, store, provider, rate_limiter, failed)
+        derive_bars(symbols, interval, store)
+        return
+    stale = stale_symbols(symbols, interval, max_age, store)
+    last_dates = store.last_bar_dates(stale, interval)
+
+    missing = [s for s in stale if s not in last_dates]
+    METRICS.incr('store_hits', len(symbols) - len(stale))
+    METRICS.incr('store_topups', len(last_dates))
+    METRICS.incr('store_misses', len(missing))
+    if missing:
+        fetched = fetch_bulk_data(missing, interval=interval, period=history,
+                                  rate_limiter=rate_limiter, provider=provider, failed=failed)
+        store.write_many(fetched, interval)
+
+    settled = store.settled_bars(list(last_dates), interval)
+    by_start = {}
+    for symbol, last_date in last_dates.items():
+        start = settled[symbol][0] if symbol in settled else last_date.strftime('%Y-%m-%d')
+        by_start.setdefault(start, []).append(symbol)
+    rebased = []
+    for start, group in by_start.items():
+        fetched = fetch_bulk_data(group, interval=interval, start=start,
+                                  rate_limiter=rate_limiter, provider=provider, failed=failed)
+        moved = [s for s, df in fetched.items() if s in settled and _readjusted(df, *settled[s])]
+        store.write_many({s: df for s, df in fetched.items() if s not in moved}, interval)
+        rebased += moved
+
+    if rebased:
+        METRICS.incr('store_rebased', len(rebased))
+        fetched = fetch_bulk_data(rebased, interval=interval, period=history,
+                                  rate_limiter=rate_limiter, provider=provider, failed=failed)
+        store.delete(list(fetched), (interval,) + DERIVED_INTERVALS)
+        store.write_many(fetched, interval)
+
+
+def _readjusted(df: pd.DataFrame, date: str, close: float) -> bool:
+    refetched = df.loc[df['Date'] == pd.Timestamp(date), 'Close']
+    return len(refetched) > 0 and abs(refetched.iloc[0] / close - 1) > ADJUSTMENT_TOLERANCE
+
+
+def derive_bars(symbols: list, interval: str, store: BarStore = None):
+    """
+    Bring the stored `interval` bars of `symbols` up to date with their stored daily bars.
+
+    Symbols whose last derived bar matches their last daily bar (same date and close) are
+    skipped. For the others only the periods from the one holding their last derived bar onward
+    are rebuilt, since that bar may have been derived from a period still in progress.
+    """
+    store = store or BarStore()
+    daily_last = store.last_bars(symbols, '1d')
+    derived_last = store.last_bars(symbols, interval)
+    by_start = {}
+    for symbol, last_bar in daily_last.items():
+        derived = derived_last.get(symbol)
+        if derived != last_bar:
+            start = None if derived is None else period_start(min(derived[0], last_bar[0]), interval)
+            by_start.setdefault(start, []).append(symbol)
+    stale = sum(len(group) for group in by_start.values())
+    METRICS.incr('derived_hits', len(daily_last) - stale)
+    METRICS.incr('derived_updates', stale)
+    for start, group in by_start.items():
+        with METRICS.timer('derive', len(group)):
+            bars = resample_bars(store.read_frame(group, '1d', start), interval)
+            frames = {symbol: df.drop(columns='Symbol') for symbol, df in bars.groupby('Symbol', sort=False)}
+            store.write_many(frames, interval, since=start)
+
+
+def load_bars(symbols: list, interval: str = '1d', history: str = "5y", max_age: float = 900,
+              store: BarStore = None, provider=None, rate_limiter=None, failed: list = None) -> dict:
+    """
+    Return bars for `symbols` from the on-disk store, topping it up first (see `refresh_bars`).
+    """
+    store = store or BarStore()
+    refresh_bars(symbols, interval, history, max_age, store, provider, rate_limiter, failed)
+    return store.read_many(symbols, interval)
+
+
+def load_bar_array(symbols: list, interval: str = '1d', history: str = "5y", max_age: float = 900,
+                   store: BarStore = None, provider=None, rate_limiter=None, dtype=np.float64,
+                   failed: list = None) -> BarArray:
+    """
+    Like `load_bars`, but returns the whole universe as one columnar `BarArray`.
+    """
+    store = store or BarStore()
+    refresh_bars(symbols, interval, history, max_age, store, provider, rate_limiter, failed)
+    return store.read_array(symbols, interval, dtype)
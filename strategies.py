@@ -0,0 +1,231 @@
+import numpy as np
+import pandas as pd
+from indicators import IndicatorCache, cross_above, price_matrices
+
+
+class Strategy:
+    """
+    A scan strategy. Subclasses set `key`, `name` and `defaults`, declare the indicators and
+    lookback they need, and mark the bars where they fire.
+    """
+    key = ""
+    name = ""
+    defaults = {}
+    outputs = ()
+
+    def __init__(self, **params):
+        unknown = set(params) - set(self.defaults)
+        if unknown:
+            raise ValueError(f"Unknown parameters for {self.name}: {', '.join(sorted(unknown))}")
+        self.params = {**self.defaults, **params}
+
+    def __repr__(self):
+        params = ", ".join(f"{k}={v}" for k, v in self.params.items())
+        return f"{type(self).__name__}({params})"
+
+    @property
+    def indicators(self) -> list:
+        """
+        Indicator specs understood by `IndicatorCache.compute`.
+        """
+        return []
+
+    @property
+    def lookback(self) -> int:
+        """
+        Bars of history a symbol needs before the strategy may fire.
+        """
+        return 2
+
+    def signal(self, ind: IndicatorCache) -> np.ndarray:
+        """
+        Packed (bars × symbols) booleans, True on every bar where the strategy fires.
+        """
+        raise NotImplementedError
+
+    def levels(self, ind: IndicatorCache) -> dict:
+        """
+        Packed price levels reported with each signal (e.g. a stop), keyed by the names in `outputs`.
+        """
+        return {}
+
+
+class MacdCross(Strategy):
+    key = "macd"
+    name = "MACD Bullish Crossover"
+    defaults = {'fast': 12, 'slow': 26, 'signal': 9}
+
+    @property
+    def indicators(self):
+        return [('macd', self.params['fast'], self.params['slow'], self.params['signal'])]
+
+    @property
+    def lookback(self):
+        return self.params['slow'] + self.params['signal']
+
+    def signal(self, ind):
+        line, signal_line, _ = ind.compute(self.indicators[0])
+        return cross_above(line, signal_line)
+
+
+class WeeklyConfirmedMacd(Strategy):
+    """
+    A daily MACD bullish crossover while the weekly MACD line is above its signal line, i.e. the
+    last completed weekly bar confirms the trend. Meant for daily bars; the weekly bars are
+    derived from them.
+    """
+    key = "macd_weekly"
+    name = "MACD Crossover (Weekly Confirmed)"
+    defaults = {'fast': 12, 'slow': 26, 'signal': 9}
+
+    @property
+    def indicators(self):
+        spec = ('macd', self.params['fast'], self.params['slow'], self.params['signal'])
+        return [spec, ('on', '1wk', spec)]
+
+    @property
+    def lookback(self):
+        # The weekly MACD needs as many weeks as the daily one needs days.
+        return (self.params['slow'] + self.params['signal']) * 5
+
+    def signal(self, ind):
+        line, signal_line, _ = ind.compute(self.indicators[0])
+        weekly_line, weekly_signal, _ = ind.compute(self.indicators[1])
+        with np.errstate(invalid='ignore'):
+            return cross_above(line, signal_line) & (weekly_line > weekly_signal)
+
+
+class EmaCross(Strategy):
+    key = "ema200"
+    name = "Price Crosses Above 200 EMA"
+    defaults = {'span': 200}
+
+    @property
+    def indicators(self):
+        return [('ema', self.params['span'])]
+
+    @property
+    def lookback(self):
+        return self.params['span']
+
+    def signal(self, ind):
+        return cross_above(ind.close, ind.compute(self.indicators[0]))
+
+
+class SigmaSignal(Strategy):
+    key = "sigma"
+    name = "Sigma Signal"
+    defaults = {'period': 50, 'width': 2, 'atr_period': 14, 'atr_factor': 1.8}
+    outputs = ('ATR Stop',)
+
+    @property
+    def indicators(self):
+        return [('bands', self.params['period'], self.params['width']),
+                ('atr_stop', self.params['atr_period'], self.params['atr_factor'])]
+
+    @property
+    def lookback(self):
+        return max(self.params['period'], self.params['atr_period']) + 1
+
+    def signal(self, ind):
+        _, upper, _ = ind.compute(self.indicators[0])
+        return cross_above(ind.close, upper)
+
+    def levels(self, ind):
+        return {'ATR Stop': ind.compute(self.indicators[1])}
+
+
+class RsiReversal(Strategy):
+    key = "rsi"
+    name = "RSI Oversold Reversal"
+    defaults = {'period': 14, 'oversold': 30}
+
+    @property
+    def indicators(self):
+        return [('rsi', self.params['period'])]
+
+    @property
+    def lookback(self):
+        return self.params['period'] + 1
+
+    def signal(self, ind):
+        return cross_above(ind.compute(self.indicators[0]), self.params['oversold'])
+
+
+class BollingerBreakout(Strategy):
+    key = "bollinger"
+    name = "Bollinger Band Breakout"
+    defaults = {'window': 20, 'width': 2}
+
+    @property
+    def indicators(self):
+        return [('bands', self.params['window'], self.params['width'])]
+
+    @property
+    def lookback(self):
+        return self.params['window'] + 1
+
+    def signal(self, ind):
+        _, upper, _ = ind.compute(self.indicators[0])
+        return cross_above(ind.close, upper)
+
+
+STRATEGIES = {cls.key: cls for cls in (MacdCross, WeeklyConfirmedMacd, EmaCross, SigmaSignal, RsiReversal,
+                                       BollingerBreakout)}
+
+
+def get_strategy(key: str, **params) -> Strategy:
+    if key not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{key}', expected one of: {', '.join(STRATEGIES)}")
+    return STRATEGIES[key](**params)
+
+
+def output_columns(strategies: list) -> list:
+    """
+    Names of the levels reported by `strategies`, each once, in strategy order.
+    """
+    return list(dict.fromkeys(name for s in strategies for name in s.outputs))
+
+
+def fired(strategy: Strategy, ind: IndicatorCache) -> np.ndarray:
+    """
+    Packed booleans of the bars where `strategy` fires with enough history behind them.
+    """
+    return strategy.signal(ind) & ind.warmed_up(strategy.lookback)
+
+
+def evaluate(data: dict, strategies: list, as_of=None) -> pd.DataFrame:
+    """
+    Evaluate several strategies on one fetch of `data`, sharing every indicator between them.
+
+    Returns one row per symbol: the latest close ('Price'), the close of the evaluated bar
+    ('Price Then'), one boolean column per strategy name and the levels strategies report
+    (their `outputs`, e.g. 'ATR Stop') on the evaluated bar. With `as_of`, strategies are
+    checked on each symbol's last bar on or before that date instead of its latest bar.
+    """
+    dates, symbols, bars = price_matrices(data, symbols=list(data))
+    columns = ['Symbol', 'Price', 'Price Then'] + [s.name for s in strategies] + output_columns(strategies)
+    if not symbols:
+        return pd.DataFrame(columns=columns)
+
+    bar = None
+    if as_of:
+        bar = dates.searchsorted(pd.to_datetime(as_of), side='right') - 1
+    ind = IndicatorCache(bars['Close'], bars['High'], bars['Low'], dates)
+    pos = ind.position(bar) if bar is None or bar >= 0 else np.full(len(symbols), -1)
+    cols = np.arange(len(symbols))
+    has_bar = pos >= 0
+    rows = np.maximum(pos, 0)
+
+    result = pd.DataFrame({
+        'Symbol': symbols,
+        'Price': ind.close[-1],
+        'Price Then': np.where(has_bar, ind.close[rows, cols], np.nan),
+    })
+    for strategy in strategies:
+        result[strategy.name] = has_bar & fired(strategy, ind)[rows, cols]
+    for strategy in strategies:
+        for name, values in strategy.levels(ind).items():
+            if name not in result:
+                result[name] = np.where(has_bar, values[rows, cols], np.nan)
+    return result
@@ -0,0 +1,300 @@
+import json
+import math
+from collections import deque
+
+# Constant-time, per-symbol indicator state for live and intraday updates.
+# Each class follows the same floating-point steps as the pandas kernels behind
+# `ewm(adjust=False).mean()` and `rolling(window).mean()/.std()`, so a state fed the same bars
+# reproduces the batch `calculate_macd`/`calculate_sigma_signal` columns exactly.
+
+NAN = float('nan')
+
+
+class StreamingEMA:
+    def __init__(self, span: int = None, alpha: float = None, value: float = NAN):
+        self.span = span
+        self.alpha = alpha or 2.0 / (span + 1.0)
+        self.value = value
+
+    def update(self, x: float) -> float:
+        if math.isnan(x):
+            return self.value
+        if math.isnan(self.value):
+            self.value = x
+        elif self.value != x:
+            old_wt = 1.0 - self.alpha
+            self.value = (old_wt * self.value + self.alpha * x) / (old_wt + self.alpha)
+        return self.value
+
+    def to_dict(self) -> dict:
+        return {'span': self.span, 'alpha': self.alpha, 'value': self.value}
+
+    @classmethod
+    def from_dict(cls, state: dict):
+        return cls(**state)
+
+
+class StreamingMACD:
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+
+    def update(self, close: float):
+        """
+        Returns (MACD, Signal, Hist) after adding one close.
+        """
+        macd = self.fast.update(close) - self.slow.update(close)
+        signal = self.signal.update(macd)
+        return macd, signal, macd - signal
+
+    def to_dict(self) -> dict:
+        return {'fast': self.fast.to_dict(), 'slow': self.slow.to_dict(), 'signal': self.signal.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state: dict):
+        obj = cls.__new__(cls)
+        obj.fast = StreamingEMA.from_dict(state['fast'])
+        obj.slow = StreamingEMA.from_dict(state['slow'])
+        obj.signal = StreamingEMA.from_dict(state['signal'])
+        return obj
+
+
+class StreamingRollingStats:
+    """
+    Rolling mean and sample standard deviation over the last `window` values.
+
+    Mirrors pandas' online `roll_mean` (Kahan-compensated sum) and `roll_var` (Welford with
+    removal) kernels; the window itself is kept so the oldest value can be removed in O(1).
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        # roll_mean state
+        self.nobs = 0
+        self.sum_x = 0.0
+        self.neg_ct = 0
+        self.mean_add_comp = 0.0
+        self.mean_remove_comp = 0.0
+        # roll_var state
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.var_add_comp = 0.0
+        self.var_remove_comp = 0.0
+        # shared by both kernels
+        self.same_count = 0
+        self.prev_value = None
+
+    def update(self, x: float):
+        """
+        Returns (mean, std) of the window ending at `x`; NaN until the window is full.
+        """
+        if self.prev_value is None:
+            self.prev_value = x
+        if len(self.values) == self.window:
+            self._remove(self.values.popleft())
+        self.values.append(x)
+        self._add(x)
+        return self.mean, self.std
+
+    def _add(self, val: float):
+        if math.isnan(val):
+            return
+        self.nobs += 1
+        y = val - self.mean_add_comp
+        t = self.sum_x + y
+        self.mean_add_comp = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct += 1
+        self.same_count = self.same_count + 1 if val == self.prev_value else 1
+        self.prev_value = val
+
+        prev_mean = self.mean_x - self.var_add_comp
+        y = val - self.var_add_comp
+        t = y - self.mean_x
+        self.var_add_comp = t + self.mean_x - y
+        self.mean_x = self.mean_x + t / self.nobs
+        self.ssqdm_x = self.ssqdm_x + (val - prev_mean) * (val - self.mean_x)
+
+    def _remove(self, val: float):
+        if math.isnan(val):
+            return
+        self.nobs -= 1
+        y = -val - self.mean_remove_comp
+        t = self.sum_x + y
+        self.mean_remove_comp = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct -= 1
+
+        if self.nobs:
+            prev_mean = self.mean_x - self.var_remove_comp
+            y = val - self.var_remove_comp
+            t = y - self.mean_x
+            self.var_remove_comp = t + self.mean_x - y
+            self.mean_x = self.mean_x - t / self.nobs
+            self.ssqdm_x = self.ssqdm_x - (val - prev_mean) * (val - self.mean_x)
+        else:
+            self.mean_x = 0.0
+            self.ssqdm_x = 0.0
+
+    @property
+    def mean(self) -> float:
+        if self.nobs < self.window:
+            return NAN
+        if self.same_count >= self.nobs:
+            return self.prev_value
+        result = self.sum_x / self.nobs
+        if self.neg_ct == 0 and result < 0:
+            return 0.0
+        if self.neg_ct == self.nobs and result > 0:
+            return 0.0
+        return result
+
+    @property
+    def std(self) -> float:
+        if self.nobs < self.window or self.nobs <= 1:
+            return NAN
+        if self.same_count >= self.nobs:
+            return 0.0
+        return math.sqrt(max(self.ssqdm_x / (self.nobs - 1), 0.0))
+
+    def to_dict(self) -> dict:
+        state = dict(vars(self))
+        state['values'] = list(self.values)
+        return state
+
+    @classmethod
+    def from_dict(cls, state: dict):
+        obj = cls.__new__(cls)
+        vars(obj).update(state)
+        obj.values = deque(state['values'])
+        return obj
+
+
+class StreamingATR:
+    """
+    Wilder's ATR (true range smoothed with alpha = 1/period), as in `calculate_sigma_signal`.
+    """
+
+    def __init__(self, period: int = 14):
+        self.prev_close = NAN
+        self.tr_ema = StreamingEMA(alpha=1.0 / period)
+
+    def update(self, high: float, low: float, close: float) -> float:
+        ranges = [high - low, abs(high - self.prev_close), abs(low - self.prev_close)]
+        ranges = [r for r in ranges if not math.isnan(r)]
+        self.prev_close = close
+        return self.tr_ema.update(max(ranges) if ranges else NAN)
+
+    def to_dict(self) -> dict:
+        return {'prev_close': self.prev_close, 'tr_ema': self.tr_ema.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state: dict):
+        obj = cls.__new__(cls)
+        obj.prev_close = state['prev_close']
+        obj.tr_ema = StreamingEMA.from_dict(state['tr_ema'])
+        return obj
+
+
+class SymbolState:
+    """
+    Everything the MACD, 200-EMA and Sigma scans need for one symbol, updated one bar at a time.
+    """
+
+    def __init__(self, sigma_period: int = 50, sigma_width: float = 2, atr_period: int = 14,
+                 atr_factor: float = 1.8):
+        self.sigma_width = sigma_width
+        self.atr_factor = atr_factor
+        self.macd = StreamingMACD()
+        self.ema200 = StreamingEMA(200)
+        self.bands = StreamingRollingStats(sigma_period)
+        self.atr = StreamingATR(atr_period)
+        self.last = None
+
+    def update(self, close: float, high: float = NAN, low: float = NAN) -> dict:
+        """
+        Add one bar and return its indicator values plus the crossovers it completed.
+        """
+        close, high, low = float(close), float(high), float(low)
+        macd, signal, hist = self.macd.update(close)
+        ema200 = self.ema200.update(close)
+        mean, std = self.bands.update(close)
+        atr = self.atr.update(high, low, close)
+        bar = {
+            'Close': close, 'MACD': macd, 'Signal': signal, 'Hist': hist, 'EMA200': ema200,
+            'MA': mean, 'STD': std, 'Upper': mean + self.sigma_width * std,
+            'ATR': atr, 'ATR_Stop': close - atr * self.atr_factor,
+        }
+        prev = self.last or {}
+        bar['MACD Cross'] = bool(prev) and prev['MACD'] < prev['Signal'] and macd > signal
+        bar['EMA200 Cross'] = bool(prev) and prev['Close'] < prev['EMA200'] and close > ema200
+        bar['Sigma Entry'] = bool(prev) and prev['Close'] < prev['Upper'] and close > bar['Upper']
+        self.last = bar
+        return bar
+
+    def to_dict(self) -> dict:
+        return {
+            'sigma_width': self.sigma_width, 'atr_factor': self.atr_factor,
+            'macd': self.macd.to_dict(), 'ema200': self.ema200.to_dict(),
+            'bands': self.bands.to_dict(), 'atr': self.atr.to_dict(), 'last': self.last,
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict):
+        obj = cls.__new__(cls)
+        obj.sigma_width = state['sigma_width']
+        obj.atr_factor = state['atr_factor']
+        obj.macd = StreamingMACD.from_dict(state['macd'])
+        obj.ema200 = StreamingEMA.from_dict(state['ema200'])
+        obj.bands = StreamingRollingStats.from_dict(state['bands'])
+        obj.atr = StreamingATR.from_dict(state['atr'])
+        obj.last = state['last']
+        return obj
+
+    @classmethod
+    def from_history(cls, df, **kwargs):
+        """
+        Build a state by replaying a symbol's bars (a frame with Close and optionally High/Low).
+        """
+        state = cls(**kwargs)
+        highs = df['High'] if 'High' in df else [NAN] * len(df)
+        lows = df['Low'] if 'Low' in df else [NAN] * len(df)
+        for close, high, low in zip(df['Close'], highs, lows):
+            state.update(close, high, low)
+        return state
+
+
+def seed_states(data: dict, **kwargs) -> dict:
+    """
+    Build a SymbolState per symbol from {symbol: DataFrame} history, e.g. the output of `load_bars`.
+    """
+    return {symbol: SymbolState.from_history(df, **kwargs) for symbol, df in data.items()}
+
+
+def update_states(states: dict, bars: dict) -> dict:
+    """
+    Feed one new bar per symbol, given as {symbol: (close, high, low)}, and return the updated
+    bar values keyed by symbol; symbols without a state are seeded from this bar.
+    """
+    updated = {}
+    for symbol, (close, high, low) in bars.items():
+        state = states.setdefault(symbol, SymbolState())
+        updated[symbol] = state.update(close, high, low)
+    return updated
+
+
+def save_states(states: dict, path: str):
+    """
+    Write {symbol: SymbolState} to a JSON file.
+    """
+    with open(path, 'w') as f:
+        json.dump({symbol: state.to_dict() for symbol, state in states.items()}, f)
+
+
+def load_states(path: str) -> dict:
+    with open(path) as f:
+        return {symbol: SymbolState.from_dict(state) for symbol, state in json.load(f).items()}
@@ -0,0 +1,37 @@
+import numpy as np
+from benchmark import SyntheticProvider
+from indicators import compute_indicators, price_matrices
+from utils import calculate_macd, calculate_sigma_signal
+
+
+def gapped_bars(n_symbols: int = 6) -> dict:
+    """
+    Synthetic bars where every symbol starts on a different date and misses random sessions,
+    so the symbols' dates interleave on the shared grid.
+    """
+    provider = SyntheticProvider(seed=3)
+    rng = np.random.default_rng(11)
+    data = {}
+    for i in range(n_symbols):
+        symbol = f"SYM{i}.NS"
+        df = provider([symbol], period="3y")[symbol].reset_index()
+        df = df.iloc[rng.integers(0, 200):]
+        data[symbol] = df[rng.random(len(df)) > 0.1].reset_index(drop=True)
+    return data
+
+
+def test_compute_indicators_matches_per_symbol_functions_on_gapped_data():
+    data = gapped_bars()
+    _, symbols, bars = price_matrices(data)
+    ind = compute_indicators(bars['Close'], bars['High'], bars['Low'])
+
+    for col, symbol in enumerate(symbols):
+        expected = calculate_sigma_signal(calculate_macd(data[symbol].copy()))
+        has_bar = ~np.isnan(bars['Close'][:, col])
+        for name in ('EMA12', 'EMA26', 'MACD', 'Signal', 'Hist', 'EMA100'):
+            np.testing.assert_array_equal(ind[name][has_bar, col], expected[name].to_numpy(), err_msg=name)
+        for name in ('MA50', 'STD', 'Upper', 'Lower', 'ATR', 'ATR_Stop'):
+            np.testing.assert_allclose(ind[name][has_bar, col], expected[name].to_numpy(),
+                                       rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=name)
+        # Cells without a bar stay empty.
+        assert np.isnan(ind['MACD'][~has_bar, col]).all()
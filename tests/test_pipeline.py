@@ -0,0 +1,64 @@
+import sqlite3
+from contextlib import closing
+from functools import partial
+from metrics import Metrics
+from pipeline import scan_cached, scan_parallel
+from scancache import SCAN_CACHE_DB
+from store import BarStore, load_bars
+from strategies import get_strategy
+from test_store import FlakyProvider
+from utils import RateLimiter
+
+SYMBOLS = [f"SYM{i}.NS" for i in range(60)]
+STRATEGIES = [get_strategy('macd'), get_strategy('bollinger')]
+
+
+def cached_scans() -> int:
+    with closing(sqlite3.connect(SCAN_CACHE_DB)) as conn:
+        return conn.execute("SELECT COUNT(*) FROM scan_cache").fetchone()[0]
+
+
+def scan(load):
+    return [m for _, matches in scan_cached(SYMBOLS, STRATEGIES, load=load) for m in matches]
+
+
+def test_scan_during_provider_outage_is_not_cached(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    provider = FlakyProvider()
+    load = partial(load_bars, history="1y", provider=provider)
+    metrics = Metrics()
+    with metrics.activate():
+        provider.down = True
+        assert scan(load) == []
+        assert cached_scans() == 0
+        provider.down = False
+        recovered = scan(load)
+        assert metrics.counters['scan_cache_misses'] == 2
+        assert 'scan_cache_hits' not in metrics.counters
+        assert scan(load) == recovered
+        assert metrics.counters['scan_cache_hits'] == 1
+    assert recovered
+
+
+def test_empty_group_is_never_served_from_the_cache(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert list(scan_cached([], STRATEGIES)) == []
+    assert list(scan_cached([], STRATEGIES)) == []
+    assert cached_scans() == 0
+
+
+def test_parallel_scan_keeps_input_order_whatever_the_worker_count(tmp_path):
+    path = str(tmp_path / "bars.db")
+    # Reverse-sorted so the store's symbol order differs from the input order.
+    symbols = sorted((f"SYM{i}.NS" for i in range(200)), reverse=True)
+    load_bars(symbols, history="1y", store=BarStore(path), provider=FlakyProvider(),
+              rate_limiter=RateLimiter(max_calls=1000))
+
+    def scan_with(workers, shared=False):
+        return [m['Symbol'] for _, matches in scan_parallel(symbols, STRATEGIES, workers=workers, store_path=path,
+                                                            refresh=False, shared=shared) for m in matches]
+
+    expected = scan_with(1, shared=True)
+    assert expected == [s for s in symbols if s in expected]
+    for workers in (1, 2, 4):
+        assert scan_with(workers) == expected
@@ -0,0 +1,49 @@
+from benchmark import SyntheticProvider
+from store import BarStore, load_bars
+from utils import RateLimiter
+
+SYMBOLS = [f"SYM{i}.NS" for i in range(6)]
+
+
+class FlakyProvider(SyntheticProvider):
+    """
+    `SyntheticProvider` that raises like an unreachable server while `down` is set.
+    """
+
+    down = False
+
+    def __call__(self, symbols: list, interval: str = '1d', period: str = None, start=None) -> dict:
+        if self.down:
+            self.calls += 1
+            raise ConnectionError("provider unreachable")
+        return super().__call__(symbols, interval, period, start)
+
+
+def load(store, provider, max_age=900):
+    return load_bars(SYMBOLS, history="1y", max_age=max_age, store=store, provider=provider,
+                     rate_limiter=RateLimiter(max_calls=1000))
+
+
+def test_symbols_are_refetched_after_an_outage_on_first_download(tmp_path):
+    store = BarStore(str(tmp_path / "bars.db"))
+    provider = FlakyProvider()
+    provider.down = True
+    assert load(store, provider) == {}
+    assert store.refreshed_at(SYMBOLS, '1d') == {}
+
+    provider.down = False
+    calls = provider.calls
+    data = load(store, provider)
+    assert provider.calls > calls
+    assert sorted(data) == SYMBOLS
+
+
+def test_symbols_are_refetched_after_an_outage_on_top_up(tmp_path):
+    store = BarStore(str(tmp_path / "bars.db"))
+    provider = FlakyProvider()
+    load(store, provider)
+    refreshed_at = store.refreshed_at(SYMBOLS, '1d')
+
+    provider.down = True
+    load(store, provider, max_age=0)
+    assert store.refreshed_at(SYMBOLS, '1d') == refreshed_at
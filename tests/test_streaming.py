@@ -0,0 +1,31 @@
+import json
+import numpy as np
+import pandas as pd
+from benchmark import SyntheticProvider
+from streaming import SymbolState
+from utils import calculate_macd, calculate_sigma_signal
+
+
+def replay(df: pd.DataFrame, save_at: int) -> pd.DataFrame:
+    state = SymbolState()
+    rows = []
+    for i, bar in enumerate(df.itertuples(index=False)):
+        if i == save_at:
+            state = SymbolState.from_dict(json.loads(json.dumps(state.to_dict())))
+        rows.append(state.update(bar.Close, bar.High, bar.Low))
+    return pd.DataFrame(rows)
+
+
+def test_symbol_state_matches_batch_indicators_across_save_and_restore():
+    provider = SyntheticProvider(seed=7)
+    for symbol in ("RELIANCE.NS", "TCS.NS", "INFY.NS"):
+        df = provider([symbol], period="2y")[symbol].reset_index()
+        streamed = replay(df, save_at=len(df) // 2)
+        batch = calculate_sigma_signal(calculate_macd(df.copy()))
+
+        for column in ('MACD', 'Signal', 'Hist', 'Upper', 'STD', 'ATR', 'ATR_Stop'):
+            np.testing.assert_array_equal(streamed[column].to_numpy(), batch[column].to_numpy(), err_msg=column)
+        np.testing.assert_array_equal(streamed['MA'].to_numpy(), batch['MA50'].to_numpy())
+        np.testing.assert_array_equal(streamed['EMA200'].to_numpy(),
+                                      df['Close'].ewm(span=200, adjust=False).mean().to_numpy())
+        np.testing.assert_array_equal(streamed['Sigma Entry'].to_numpy(), batch['Sigma_Entry'].to_numpy())
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+from benchmark import SyntheticProvider
+from indicators import IndicatorCache, price_matrices
+from store import BarStore, load_bars
+from timeframes import resample_bars
+from utils import RateLimiter
+
+SYMBOLS = ["RELIANCE.NS", "TCS.NS", "INFY.NS"]
+
+
+def test_incremental_derivation_matches_full_resample(tmp_path):
+    store = BarStore(str(tmp_path / "bars.db"))
+    # Top-ups land mid-week, on a Friday, across a month end and a few sessions apart.
+    for end in ("2025-06-25", "2025-06-27", "2025-07-01", "2025-07-02", "2025-07-11", "2025-08-05"):
+        for interval in ('1wk', '1mo'):
+            load_bars(SYMBOLS, interval, history="1y", max_age=0, store=store,
+                      provider=SyntheticProvider(end=end), rate_limiter=RateLimiter(max_calls=1000))
+            derived = store.read_many(SYMBOLS, interval)
+            full = resample_bars(store.read_frame(SYMBOLS, '1d'), interval)
+            for symbol in SYMBOLS:
+                expected = full[full['Symbol'] == symbol].drop(columns='Symbol').reset_index(drop=True)
+                pd.testing.assert_frame_equal(derived[symbol][expected.columns], expected,
+                                              check_dtype=False, obj=f"{symbol} {interval} to {end}")
+
+
+def test_higher_timeframe_indicators_never_use_a_forming_period():
+    provider = SyntheticProvider(seed=5)
+    data = {symbol: df.reset_index() for symbol, df in provider(SYMBOLS, period="2y").items()}
+    # One symbol misses sessions, so its periods end on different days than the others'.
+    data["TCS.NS"] = data["TCS.NS"][np.random.default_rng(1).random(len(data["TCS.NS"])) > 0.2]
+    dates, symbols, bars = price_matrices(data)
+
+    def weekly_and_monthly(rows):
+        ind = IndicatorCache(bars['Close'][:rows], bars['High'][:rows], bars['Low'][:rows], dates=dates[:rows])
+        return [ind.expand(ind.on(interval, spec)) for interval, spec in
+                (('1wk', ('ema', 10)), ('1wk', ('atr', 5)), ('1mo', ('sma', 3)))]
+
+    full = weekly_and_monthly(len(dates))
+    # A value depends only on bars up to its date: cutting the history there does not change it,
+    # which would fail if the period still forming on that date were used.
+    for rows in range(len(dates) - 150, len(dates) + 1, 7):
+        for values, truncated in zip(full, weekly_and_monthly(rows)):
+            np.testing.assert_array_equal(truncated[-1], values[rows - 1], err_msg=f"{dates[rows - 1]:%Y-%m-%d}")
+
+    # Within a week, every session before Friday still sees the previous week's bar.
+    weekly_ema = pd.DataFrame(full[0], index=dates)
+    column = symbols.index("RELIANCE.NS")
+    for date, value in weekly_ema[column].items():
+        if date.weekday() < 4:
+            previous_friday = date - pd.Timedelta(days=date.weekday() + 3)
+            if previous_friday in weekly_ema.index:
+                np.testing.assert_equal(value, weekly_ema.loc[previous_friday, column])
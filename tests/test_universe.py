@@ -0,0 +1,19 @@
+import universe
+
+
+class HtmlResponse:
+    text = "<html><body>Access Denied</body></html>"
+
+    def raise_for_status(self):
+        pass
+
+
+def test_unreadable_download_keeps_the_local_list_and_leaves_no_tmp_file(tmp_path, monkeypatch):
+    group = next(iter(universe.NSE_GROUPS))
+    path = tmp_path / universe.NSE_GROUPS[group]
+    path.write_text("Company Name,Industry,Symbol,Series,ISIN Code\nReliance,Energy,RELIANCE,EQ,INE002A01018\n")
+    monkeypatch.setattr(universe.requests, "get", lambda *args, **kwargs: HtmlResponse())
+
+    universe.download_constituents(str(tmp_path), [group])
+    assert sorted(p.name for p in tmp_path.iterdir()) == [path.name]
+    assert universe._read_constituents(str(path))['Symbol'].tolist() == ["RELIANCE"]
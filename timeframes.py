@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+# Weekly and monthly bars are derived from the stored daily bars instead of being downloaded.
+# Periods follow the exchange week (Monday to Friday) and the calendar month; a period's bar
+# aggregates the sessions traded in it and is dated on the last of them.
+PERIODS = {'1wk': 'W-FRI', '1mo': 'M'}
+DERIVED_INTERVALS = tuple(PERIODS)
+
+
+def period_start(date, interval: str) -> pd.Timestamp:
+    """
+    First calendar day of the `interval` period containing `date`.
+    """
+    return pd.Timestamp(date).to_period(PERIODS[interval]).start_time
+
+
+def resample_bars(daily: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """
+    Aggregate long daily bars (Symbol, Date and OHLCV columns, sorted by symbol and date) into
+    one `interval` bar per symbol and period: first open, highest high, lowest low, last close
+    and total volume, dated on the symbol's last session of the period.
+    """
+    if daily.empty:
+        return daily.copy()
+    period = daily['Date'].dt.to_period(PERIODS[interval]).rename('Period')
+    bars = daily.groupby([daily['Symbol'], period], sort=False).agg(
+        Date=('Date', 'last'), Open=('Open', 'first'), High=('High', 'max'),
+        Low=('Low', 'min'), Close=('Close', 'last'), Volume=('Volume', 'sum'),
+    )
+    return bars.reset_index(level='Symbol').reset_index(drop=True)
+
+
+def resample_matrix(dates, arrays: dict, interval: str):
+    """
+    Aggregate (dates × symbols) daily arrays, keyed by OHLCV column name, into (periods × symbols)
+    arrays the same way as `resample_bars`.
+
+    Returns the date of each period's last session, the aggregated arrays and, for every daily
+    row, the index of the latest period complete on that date (-1 if none). A period is complete
+    from its last weekday on, so daily rows never see a higher-timeframe bar that is still forming.
+    """
+    dates = pd.DatetimeIndex(dates)
+    codes, periods = pd.factorize(dates.to_period(PERIODS[interval]))
+    out = {}
+    for column, values in arrays.items():
+        grouped = pd.DataFrame(values).groupby(codes)
+        if column == 'Volume':
+            out[column] = grouped.sum(min_count=1).to_numpy()
+        else:
+            how = {'Open': 'first', 'High': 'max', 'Low': 'min'}.get(column, 'last')
+            out[column] = getattr(grouped, how)().to_numpy()
+    period_dates = pd.Series(dates).groupby(codes).last()
+
+    end = periods.end_time.normalize()
+    last_weekday = end - pd.to_timedelta(np.maximum(end.weekday - 4, 0), unit='D')
+    complete = np.where(dates >= last_weekday[codes], codes, codes - 1)
+    return pd.DatetimeIndex(period_dates), out, complete
@@ -0,0 +1,203 @@
+import os
+import re
+import threading
+import time
+import pandas as pd
+import requests
+from metrics import METRICS
+
+# NSE index constituent lists: group name -> file name, both on archives.nseindia.com and in data/.
+NSE_INDEX_URL = "https://archives.nseindia.com/content/indices/"
+NSE_GROUPS = {
+    "Nifty 50": "ind_nifty50list.csv",
+    "Nifty Next 50": "ind_niftynext50list.csv",
+    "Nifty 100": "ind_nifty100list.csv",
+    "Nifty 200": "ind_nifty200list.csv",
+    "Nifty 500": "ind_nifty500list.csv",
+    "NIFTY Small cap 50": "ind_niftysmallcap50list.csv",
+    "NIFTY Small cap 100": "ind_niftysmallcap100list.csv",
+    "NIFTY Small cap 250": "ind_niftysmallcap250list.csv",
+    "NIFTY MIDCAP 50": "ind_niftymidcap50list.csv",
+    "NIFTY MIDCAP 100": "ind_niftymidcap100list.csv",
+    "NIFTY MIDCAP 150": "ind_niftymidcap150list.csv",
+    "BANK": "ind_niftybanklist.csv",
+    "FINANCIAL SERVICES": "ind_niftyfinancelist.csv",
+    "FMCG": "ind_niftyfmcglist.csv",
+    "IT": "ind_niftyitlist.csv",
+    "MEDIA": "ind_niftymedialist.csv",
+    "METAL": "ind_niftymetallist.csv",
+    "PHARMA": "ind_niftypharmalist.csv",
+    "PSU BANK": "ind_niftypsubanklist.csv",
+    "REALTY": "ind_niftyrealtylist.csv",
+}
+DATA_DIR = "data"
+UNIVERSE_TTL = 24 * 3600
+INDUSTRY_PREFIX = "industry:"
+
+_OPERATOR = re.compile(r"\s+([+*-])\s+")
+
+
+class Universe:
+    """
+    Index of every NSE symbol in the constituent lists: company, industry, ISIN and the groups
+    it belongs to, with lookups by group and industry and set operations between them.
+    """
+
+    def __init__(self, frames: dict):
+        self.groups = {}
+        self.info = {}
+        for group, df in frames.items():
+            symbols = []
+            for row in df.itertuples(index=False):
+                info = self.info.setdefault(row.Symbol, {
+                    'Symbol': row.Symbol, 'Company Name': row.Company, 'Industry': row.Industry,
+                    'ISIN': row.ISIN, 'Groups': [],
+                })
+                info['Groups'].append(group)
+                symbols.append(row.Symbol)
+            self.groups[group] = symbols
+        self.industries = {}
+        for symbol, info in self.info.items():
+            self.industries.setdefault(info['Industry'], []).append(symbol)
+        self.built_at = time.time()
+
+    @classmethod
+    def from_dir(cls, data_dir: str = DATA_DIR):
+        """
+        Build the index from the constituent CSVs in `data_dir`; missing or unreadable files are skipped.
+        """
+        start = time.perf_counter()
+        frames = {}
+        for group, filename in NSE_GROUPS.items():
+            try:
+                frames[group] = _read_constituents(os.path.join(data_dir, filename))
+            except Exception as e:
+                print(f"⚠️ Could not read {group} constituents from {data_dir}: {e}")
+        universe = cls(frames)
+        METRICS.record('universe_build', time.perf_counter() - start, len(universe.info))
+        return universe
+
+    def group(self, name: str) -> list:
+        return list(self.groups.get(name, []))
+
+    def industry(self, name: str) -> list:
+        return list(self.industries.get(name, []))
+
+    def groups_of(self, symbol: str) -> list:
+        return list(self.info.get(symbol, {}).get('Groups', []))
+
+    def resolve(self, expr: str) -> list:
+        """
+        Symbols of a group expression, in the order of its first term.
+
+        Terms are group names or 'Industry: <name>', combined left to right with ' + ' (union),
+        ' - ' (difference) and ' * ' (intersection), e.g. "Nifty 500 - Nifty 100" or
+        "Nifty 200 * Industry: Information Technology".
+        """
+        parts = _OPERATOR.split(expr.strip())
+        symbols = self._term(parts[0])
+        for op, term in zip(parts[1::2], parts[2::2]):
+            other = self._term(term)
+            if op == '+':
+                seen = set(symbols)
+                symbols += [s for s in other if s not in seen]
+            else:
+                other = set(other)
+                symbols = [s for s in symbols if (s in other) == (op == '*')]
+        return symbols
+
+    def _term(self, term: str) -> list:
+        term = term.strip()
+        if term.lower().startswith(INDUSTRY_PREFIX):
+            return self.industry(term[len(INDUSTRY_PREFIX):].strip())
+        return self.group(term)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        One row per symbol with its company, industry, ISIN and comma-separated groups.
+        """
+        df = pd.DataFrame(list(self.info.values()), columns=['Symbol', 'Company Name', 'Industry', 'ISIN', 'Groups'])
+        df['Groups'] = df['Groups'].str.join(', ')
+        return df
+
+
+def _read_constituents(path: str) -> pd.DataFrame:
+    df = pd.read_csv(path)
+    df.columns = df.columns.str.strip()
+    df = df.rename(columns={'Company Name': 'Company', 'ISIN Code': 'ISIN'})
+    df = df.dropna(subset=['Symbol'])
+    for col in ('Symbol', 'Company', 'Industry', 'ISIN'):
+        df[col] = df[col].astype(str).str.strip()
+    df['Symbol'] = df['Symbol'].str.upper()
+    return df[['Symbol', 'Company', 'Industry', 'ISIN']]
+
+
+def download_constituents(data_dir: str = DATA_DIR, groups=None):
+    """
+    Download the latest constituent lists from NSE into `data_dir`. A file is only replaced
+    once its download has been read back successfully.
+    """
+    for group in groups or NSE_GROUPS:
+        filename = NSE_GROUPS[group]
+        path = os.path.join(data_dir, filename)
+        tmp = path + ".tmp"
+        try:
+            response = requests.get(NSE_INDEX_URL + filename, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
+            response.raise_for_status()
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(response.text)
+            _read_constituents(tmp)
+            os.replace(tmp, path)
+        except requests.ConnectionError as e:
+            print(f"⚠️ NSE unreachable, keeping local constituent lists: {e}")
+            return
+        except Exception as e:
+            print(f"⚠️ Failed to refresh {group} constituents: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+
+_universe = None
+_last_refresh = 0.0
+_lock = threading.Lock()
+
+
+def _files_age(data_dir: str) -> float:
+    mtimes = [os.path.getmtime(os.path.join(data_dir, f)) for f in NSE_GROUPS.values()
+              if os.path.exists(os.path.join(data_dir, f))]
+    return time.time() - min(mtimes) if mtimes else float('inf')
+
+
+def refresh_universe(data_dir: str = DATA_DIR) -> Universe:
+    """
+    Download fresh constituent lists and swap in a rebuilt index.
+    """
+    global _universe
+    download_constituents(data_dir)
+    universe = Universe.from_dir(data_dir)
+    with _lock:
+        _universe = universe
+    return universe
+
+
+def get_universe(max_age: float = UNIVERSE_TTL, data_dir: str = DATA_DIR, background: bool = True) -> Universe:
+    """
+    The shared universe index, built from the local CSVs on first use.
+
+    When the CSVs are older than `max_age` seconds, fresh lists are downloaded on a background
+    thread (at most once per `max_age`) and the current index keeps serving lookups meanwhile.
+    """
+    global _universe, _last_refresh
+    with _lock:
+        if _universe is None:
+            _universe = Universe.from_dir(data_dir)
+        universe = _universe
+        stale = _files_age(data_dir) > max_age and time.time() - _last_refresh > max_age
+        if stale:
+            _last_refresh = time.time()
+    if stale:
+        if background:
+            threading.Thread(target=refresh_universe, args=(data_dir,), daemon=True).start()
+        else:
+            universe = refresh_universe(data_dir)
+    return universe
@@ -1,34 +1,104 @@
-import numpy as np
 import pandas as pd
 import yfinance as yf
-import streamlit as st
-import requests
-from io import StringIO
-import os
-
-
-@st.cache_data(ttl=3600)
-def fetch_daily_data(symbol: str, period: str = "3mo") -> pd.DataFrame:
-    try:
-        df = yf.Ticker(symbol).history(period=period, interval='1d')
-        df.reset_index(inplace=True)
-        df['Date'] = pd.to_datetime(df['Date']).dt.tz_localize(None)  # Strip timezone globally
-        return df
-    except Exception as e:
-        print(f"Failed to fetch daily data for {symbol}: {e}")
-        return pd.DataFrame()
-
-
-@st.cache_data(ttl=3600)
-def fetch_weekly_data(symbol: str, period: str = "1y") -> pd.DataFrame:
-    try:
-        df = yf.Ticker(symbol).history(period=period, interval='1wk')
-        df.reset_index(inplace=True)
-        df['Date'] = pd.to_datetime(df['Date']).dt.tz_localize(None)  # Strip timezone globally
-        return df
-    except Exception as e:
-        print(f"Failed to fetch weekly data for {symbol}: {e}")
-        return pd.DataFrame()
+from collections import deque
+import threading
+import time
+from universe import NSE_GROUPS, get_universe
+from metrics import METRICS
+
+
+class RateLimiter:
+    """
+    Sliding-window limiter allowing at most `max_calls` provider requests per `period` seconds.
+    """
+
+    def __init__(self, max_calls: int = 2, period: float = 1.0):
+        self.max_calls = max_calls
+        self.period = period
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with METRICS.timer('rate_limit_wait'), self._lock:
+            now = time.monotonic()
+            while self._calls and now - self._calls[0] >= self.period:
+                self._calls.popleft()
+            if len(self._calls) >= self.max_calls:
+                time.sleep(self.period - (now - self._calls[0]))
+                self._calls.popleft()
+            self._calls.append(time.monotonic())
+
+
+def _normalize_bars(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Bring a provider frame to the shape `fetch_bulk_data` returns: a 'Date' column without timezone.
+    """
+    if 'Date' not in df.columns:
+        df = df.reset_index()
+        df.rename(columns={df.columns[0]: 'Date'}, inplace=True)
+    df['Date'] = pd.to_datetime(df['Date'])
+    if df['Date'].dt.tz is not None:
+        df['Date'] = df['Date'].dt.tz_localize(None)
+    return df.dropna(subset=['Close']).reset_index(drop=True)
+
+
+def yfinance_provider(symbols: list, interval: str = '1d', period: str = None, start=None) -> dict:
+    """
+    Download several tickers in a single yfinance request and split the result per symbol.
+    """
+    raw = yf.download(symbols, period=None if start else period, start=start, interval=interval,
+                      group_by='ticker', auto_adjust=True, threads=True, progress=False)
+    if raw is None or raw.empty:
+        return {}
+    frames = {}
+    for symbol in symbols:
+        if symbol not in raw.columns.get_level_values(0):
+            continue
+        frames[symbol] = raw[symbol]
+    return frames
+
+
+def fetch_bulk_data(symbols: list, interval: str = '1d', period: str = "3mo", start=None,
+                    chunk_size: int = 100, rate_limiter: RateLimiter = None, provider=None,
+                    retries: int = 1, failed: list = None) -> dict:
+    """
+    Fetch OHLCV bars for many symbols, `chunk_size` tickers per provider request.
+
+    `provider` is any callable `(symbols, interval, period, start) -> {symbol: DataFrame}`;
+    it defaults to yfinance and can be swapped for a local stand-in. A failed request is
+    retried up to `retries` times before its chunk is skipped.
+    Returns a dict keyed by symbol; symbols without data are left out. The symbols of chunks that
+    failed every attempt or came back without any bars are appended to `failed` when given.
+    """
+    provider = provider or yfinance_provider
+    rate_limiter = rate_limiter or RateLimiter()
+    data = {}
+    for i in range(0, len(symbols), chunk_size):
+        chunk = list(symbols[i:i + chunk_size])
+        frames = None
+        for attempt in range(retries + 1):
+            if attempt:
+                METRICS.incr('provider_retries')
+            rate_limiter.wait()
+            METRICS.incr('provider_requests')
+            try:
+                with METRICS.timer('fetch', len(chunk)):
+                    frames = provider(chunk, interval=interval, period=period, start=start)
+                break
+            except Exception as e:
+                METRICS.incr('provider_errors')
+                print(f"Failed to fetch {interval} data for {len(chunk)} symbols starting at {chunk[0]}: {e}")
+        received = 0
+        for symbol, df in (frames or {}).items():
+            if df is None or df.empty or 'Close' not in df.columns:
+                continue
+            df = _normalize_bars(df.copy())
+            if not df.empty:
+                data[symbol] = df
+                received += 1
+        if not received and failed is not None:
+            failed.extend(chunk)
+    return data
 
 
 def calculate_macd(df: pd.DataFrame) -> pd.DataFrame:
@@ -54,39 +124,18 @@ def detect_macd_cross(df: pd.DataFrame) -> bool:
     return prev_row['MACD'] < prev_row['Signal'] and last_row['MACD'] > last_row['Signal']
 
 
+MARKET_GROUPS = {
+    "India": list(NSE_GROUPS),
+    "USA": ["ALL USA Stocks"],
+}
+
+
 def load_group_symbols(market, group_option):
+    """
+    Symbols of a group; for India, any `Universe.resolve` expression over the local constituent index.
+    """
     if market == "India":
-        group_map = {
-            "Nifty 50": ("https://archives.nseindia.com/content/indices/ind_nifty50list.csv", "data/ind_nifty50list.csv"),
-            "Nifty Next 50": ("https://archives.nseindia.com/content/indices/ind_niftynext50list.csv", "data/ind_niftynext50list.csv"),
-            "Nifty 100": ("https://archives.nseindia.com/content/indices/ind_nifty100list.csv", "data/ind_nifty100list.csv"),
-            "Nifty 200": ("https://archives.nseindia.com/content/indices/ind_nifty200list.csv", "data/ind_nifty200list.csv"),
-            "Nifty 500": ("https://archives.nseindia.com/content/indices/ind_nifty500list.csv", "data/ind_nifty500list.csv"),
-            "NIFTY Small cap 50": ("https://archives.nseindia.com/content/indices/ind_niftysmallcap50list.csv", "data/ind_niftysmallcap50list.csv"),
-            "NIFTY Small cap 100": ("https://archives.nseindia.com/content/indices/ind_niftysmallcap100list.csv", "data/ind_niftysmallcap100list.csv"),
-            "NIFTY Small cap 250": ("https://archives.nseindia.com/content/indices/ind_niftysmallcap250list.csv", "data/ind_niftysmallcap250list.csv"),
-            "NIFTY MIDCAP 50": ("https://archives.nseindia.com/content/indices/ind_niftymidcap50list.csv", "data/ind_niftymidcap50list.csv"),
-            "NIFTY MIDCAP 100": ("https://archives.nseindia.com/content/indices/ind_niftymidcap100list.csv", "data/ind_niftymidcap100list.csv"),
-            "NIFTY MIDCAP 150": ("https://archives.nseindia.com/content/indices/ind_niftymidcap150list.csv", "data/ind_midcap150list.csv"),
-            "BANK": ("https://archives.nseindia.com/content/indices/ind_niftybanklist.csv", "data/ind_niftybanklist.csv"),
-            "FINANCIAL SERVICES": ("https://archives.nseindia.com/content/indices/ind_niftyfinancelist.csv", "data/ind_niftyfinancelist.csv"),
-            "FMCG": ("https://archives.nseindia.com/content/indices/ind_niftyfmcglist.csv", "data/ind_niftyfmcglist.csv"),
-            "IT": ("https://archives.nseindia.com/content/indices/ind_niftyitlist.csv", "data/ind_niftyitlist.csv"),
-            "MEDIA": ("https://archives.nseindia.com/content/indices/ind_niftymedialist.csv", "data/ind_niftymedialist.csv"),
-            "METAL": ("https://archives.nseindia.com/content/indices/ind_niftymetallist.csv", "data/ind_niftymetallist.csv"),
-            "PHARMA": ("https://archives.nseindia.com/content/indices/ind_niftypharmalist.csv", "data/ind_niftypharmalist.csv"),
-            "PSU BANK": ("https://archives.nseindia.com/content/indices/ind_niftypsubanklist.csv", "data/ind_niftypsubanklist.csv"),
-            "REALTY": ("https://archives.nseindia.com/content/indices/ind_niftyrealtylist.csv", "data/ind_niftyrealtylist.csv")
-        }
-
-        url_fallback = group_map.get(group_option)
-        if not url_fallback:
-            return []
-
-        url, fallback = url_fallback
-        fallback_path = os.path.join(os.getcwd(), fallback)
-        symbols = load_nse_csv_symbols(url, fallback_path=fallback_path)
-        return [symbol + ".NS" for symbol in symbols]
+        return [symbol + ".NS" for symbol in get_universe().resolve(group_option)]
 
     elif market == "USA" and group_option == "ALL USA Stocks":
         return [
@@ -131,65 +180,10 @@ def load_group_symbols(market, group_option):
         return []
 
 
-def load_nse_csv_symbols(url: str, symbol_column_name: str = 'Symbol', fallback_path: str = None) -> list:
+def calculate_sigma_signal(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Loads NSE CSV from URL or a fallback local CSV file.
+    Sigma bands, Wilder ATR and ATR stop on the real High/Low/Close (Close where High/Low are missing).
     """
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0"
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        csv_data = StringIO(response.text)
-        df = pd.read_csv(csv_data)
-        print(f"✅ Fetched symbols from URL: {url}")
-    except Exception as e:
-        print(f"⚠️ Failed to load from URL ({url}): {e}")
-        if fallback_path:
-            try:
-                df = pd.read_csv(fallback_path)
-                print(f"✅ Loaded symbols from fallback: {fallback_path}")
-            except Exception as fe:
-                print(f"❌ Fallback file failed: {fe}")
-                return []
-        else:
-            return []
-
-    df.columns = df.columns.str.strip()
-    symbols = df[symbol_column_name].dropna().str.strip().str.upper().tolist()
-    return symbols
-
-
-def update_signal_prices():
-    from db import update_signal_prices
-    from datetime import datetime, timedelta
-    import yfinance as yf
-    import sqlite3
-    import pandas as pd
-
-    conn = sqlite3.connect("signals.db")
-    cursor = conn.execute("SELECT symbol, signal_date FROM signals")
-    today = datetime.now().date()
-
-    for symbol, signal_date in cursor.fetchall():
-        d = datetime.fromisoformat(signal_date).date()
-        diff = (today - d).days
-
-        df = yf.Ticker(symbol).history(period="15d", interval="1d").reset_index()
-        df['Date'] = pd.to_datetime(df['Date']).dt.date
-
-        price_5d = df[df['Date'] == d + timedelta(days=5)]['Close'].values
-        price_10d = df[df['Date'] == d + timedelta(days=10)]['Close'].values
-
-        update_signal_prices(symbol, signal_date,
-                             price_after_5d=price_5d[0] if len(price_5d) > 0 else None,
-                             price_after_10d=price_10d[0] if len(price_10d) > 0 else None)
-
-    conn.close()
-
-
-def calculate_sigma_signal(df: pd.DataFrame) -> pd.DataFrame:
     period = 50
     width = 2
     atr_period = 14
@@ -201,14 +195,14 @@ def calculate_sigma_signal(df: pd.DataFrame) -> pd.DataFrame:
     df['Lower'] = df['MA50'] - width * df['STD']
     df['EMA100'] = df['Close'].ewm(span=100, adjust=False).mean()
 
-    high = df['Close'] + np.random.rand(len(df)) * 2
-    low = df['Close'] - np.random.rand(len(df)) * 2
+    high = df['High'] if 'High' in df else df['Close']
+    low = df['Low'] if 'Low' in df else df['Close']
     tr = pd.concat([
         high - low,
         (high - df['Close'].shift()).abs(),
         (low - df['Close'].shift()).abs()
     ], axis=1).max(axis=1)
-    df['ATR'] = tr.rolling(window=atr_period).mean()
+    df['ATR'] = tr.ewm(alpha=1.0 / atr_period, adjust=False).mean()
     df['ATR_Stop'] = df['Close'] - df['ATR'] * atr_factor
 
     df['Sigma_Entry'] = (df['Close'].shift(1) < df['Upper'].shift(1)) & (df['Close'] > df['Upper'])